@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of the `Affix` lookups, comparing the lookup tables built once upon
+class creation against rebuilding them upon every access (as the `classproperty`
+lookups previously did). The per-lookup rows are the gain of the frozen tables.
+
+The header line row times `tokenise_line` on a header line through the baseline's
+code path (one rebuilt name lookup for the header's prefix, per line) against the
+current one (the `Tokeniser` indexes a tuple of the header prefixes, so the frozen
+tables are not on this path at all): its gain is that of the tokeniser, not of the
+tables.
+
+Run with `python benchmarks/affix_lookup.py`.
+"""
+
+from contextlib import contextmanager
+from timeit import repeat
+
+from quill.scan.lever.tokens import Prefix, Tokeniser, tokenise_line
+
+
+def rebuilt_tokseq2name_multidict(cls):
+    "The multidict as rebuilt upon every access (before it was precomputed)."
+    return {
+        v._value_: [
+            k for k in cls._members_ if cls._members_.get(k)._value_ == v._value_
+        ]
+        for v in cls._members_.values()
+    }
+
+
+def rebuilt_token_from_name(cls, name):
+    "The name lookup as rebuilt upon every access (before it was precomputed)."
+    return {v._name_: v for v in cls._members_.values()}.get(name)
+
+
+def rebuilt_header_prefix(tokeniser, line):
+    "The header prefix of a line, resolved by a rebuilt name lookup (as before)."
+    start_at = len(Prefix.Header1.str)
+    hashes = line[start_at : start_at + Tokeniser.max_header]
+    level = 1 + len(hashes) - len(hashes.lstrip("#"))
+    return rebuilt_token_from_name(Prefix, f"Header{level}")
+
+
+@contextmanager
+def rebuilt_header_lookup():
+    "Patch the baseline's single rebuilt lookup per header line into `Tokeniser`."
+    frozen = Tokeniser._dispatch
+    Tokeniser._dispatch = {**frozen, "-#": rebuilt_header_prefix}
+    try:
+        yield
+    finally:
+        Tokeniser._dispatch = frozen
+
+
+def best_of(stmt, number, repeats=5):
+    "Best time per call in microseconds."
+    return min(repeat(stmt, number=number, repeat=repeats)) / number * 1e6
+
+
+def main(number=20000):
+    rows = [
+        (
+            "name -> token",
+            lambda: rebuilt_token_from_name(Prefix, "Header3"),
+            lambda: Prefix.token_from_name("Header3"),
+        ),
+        (
+            "token -> name(s)",
+            lambda: rebuilt_tokseq2name_multidict(Prefix).get("-:"),
+            lambda: Prefix.name_from_tokenseq("-:"),
+        ),
+    ]
+    print(f"{'lookup':<20}{'rebuilt (us)':>14}{'frozen (us)':>14}{'speedup':>10}")
+    for name, rebuilt, frozen in rows:
+        before, after = best_of(rebuilt, number), best_of(frozen, number)
+        print(f"{name:<20}{before:>14.3f}{after:>14.3f}{before / after:>9.1f}x")
+
+    # One header prefix is resolved per header line: by a rebuilt lookup at baseline
+    def header_line():
+        return tokenise_line("-## Heading", 0, 0)
+
+    with rebuilt_header_lookup():
+        before = best_of(header_line, number)
+    after = best_of(header_line, number)
+    print(f"{'header line':<20}{before:>14.3f}{after:>14.3f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
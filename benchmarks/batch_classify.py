@@ -0,0 +1,63 @@
+"""
+Throughput of the batch line classification (`LineBatch.classify`) against the
+`Tokeniser`, in millions of lines per second, over the MMD files passed as
+arguments (or else a generated corpus of transcript-like files).
+
+Run with `python benchmarks/batch_classify.py [paths...]`.
+"""
+
+import sys
+from random import Random
+from time import perf_counter
+
+from quill.scan.lever.batch import LineBatch
+from quill.scan.lever.structure import BlockDoc
+
+
+def generate_corpus(n_files=200, n_blocks=300, seed=0):
+    "The bytes of `n_files` generated transcript-like MMD files."
+    rnd = Random(seed)
+    contents = []
+    for _ in range(n_files):
+        lines = []
+        for b in range(n_blocks):
+            kind = rnd.random()
+            if kind < 0.2:
+                lines.append(f"-{'#' * rnd.randint(1, 3)} Section {b}")
+            elif kind < 0.5:
+                lines += ["-?What was asked?", "-:What was answered.", "-,and more"]
+            elif kind < 0.7:
+                lines.append("-A list:")
+                lines += ["-:first item", *[f"-,:item {i}" for i in range(5)]]
+            else:
+                lines += ["-A statement", "-..a descent", "-.,continued", "-,,up"]
+            lines.append("")
+        contents.append("\n".join(lines).encode())
+    return contents
+
+
+def main(paths):
+    if paths:
+        contents = []
+        for path in paths:
+            with open(path, "rb") as f:
+                contents.append(f.read())
+    else:
+        contents = generate_corpus()
+    t0 = perf_counter()
+    batch = LineBatch.from_bytes(contents)
+    t1 = perf_counter()
+    batch.classify()
+    t2 = perf_counter()
+    for content in contents:
+        BlockDoc(content.decode().splitlines())
+    t3 = perf_counter()
+    n = len(batch)
+    print(f"{n} lines in {batch.n_files} files")
+    print(f"batch load:     {t1 - t0:.3f}s")
+    print(f"batch classify: {t2 - t1:.3f}s ({n / (t2 - t1) / 1e6:.2f}M lines/s)")
+    print(f"tokeniser:      {t3 - t2:.3f}s ({n / (t3 - t2) / 1e6:.2f}M lines/s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,6 +1,10 @@
 from .__share__ import *
+from .__share__ import lazy_getattr
 from .fold import *
 from .manifest import *
 from .scan import *
 
+lazy_attrs = {**manifest.lazy_attrs, **scan.lazy_attrs}  # e.g. `ssm`, `alias_df`
+__getattr__ = lazy_getattr(__name__, lazy_attrs)
+
 __version__ = "2.4.4"
@@ -1,4 +1,5 @@
 import logging
+import os
 from enum import IntEnum
 from pathlib import Path
 from sys import stderr
@@ -9,6 +10,61 @@ __all__ = ["ql_path"]
 ql_path = Path(list(_dir_nspath)[0])
 
 
+class MtimeCached:
+    """
+    A value computed by `load` on first use and cached until the mtime of any of the
+    source files at `paths` changes (a missing file raises `FileNotFoundError` upon
+    use, not before). Used for the tables parsed from the namespace's `.mmd` files,
+    so they are only read when needed (rather than at import) and re-read if edited.
+    """
+
+    def __init__(self, load, *paths):
+        self.load = load
+        self.paths = paths
+        self.clear()
+
+    def get(self):
+        mtimes = tuple(os.stat(p).st_mtime_ns for p in self.paths)
+        if mtimes != self._mtimes:
+            self.value = self.load()
+            self._mtimes = mtimes
+        return self.value
+
+    def clear(self):
+        self.value = None
+        self._mtimes = None
+
+
+def lazy_getattr(module_name, lazy_attrs):
+    """
+    Module-level `__getattr__` (PEP 562) for the `MtimeCached` values in the dict
+    `lazy_attrs` (keyed by attribute name). Lazy attributes must be kept out of the
+    module's `__all__`, as a star import would otherwise compute them all at once.
+    """
+
+    def __getattr__(name):
+        if name in lazy_attrs:
+            return lazy_attrs[name].get()
+        raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+
+    return __getattr__
+
+
+def import_numpy():
+    """
+    Import numpy (an optional dependency, only used to process lines in batches),
+    raising an `ImportError` naming the extra which provides it if it is missing.
+    """
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(
+            "numpy is required for batch processing: install the `batch` extra"
+            ' (`pip install "ql[batch]"`)'
+        ) from e
+    return numpy
+
+
 class classproperty(property):
     "used for prefix dicts"
 
@@ -25,7 +25,12 @@ def run_defopt(config_cls: type[CylConfig] | type[StandupConfig]) -> None:
     log(f"Loaded CLI config: {config!r}")
     if config.gitlab_ci:
         log("Sourcing git repos from manifest")
-        source_manifest()
+        source_manifest(
+            jobs=config.jobs,
+            blobless=config.blobless,
+            depth=config.clone_depth,
+            sparse=config.sparse,
+        )
     log("Creating fold.cut artifacts")
     cut.standup(config)
     if config.internal:
@@ -19,6 +19,12 @@ class SiteConfig(BaseModel):
       :param gitlab_ci: Source the manifest repos (i.e. git pull them) and then stash
                         the changes after building, switch to the www branch, pop the
                         stash and push the changes (i.e. publish the website content).
+      :param jobs: How many manifest repos to clone at once when sourcing them.
+      :param blobless: Source the manifest repos as blobless partial clones.
+      :param clone_depth: Source the manifest repos as shallow clones of this many
+                          commits.
+      :param sparse: Only check out the directories of the manifest repos that are
+                     used to build the sites.
     """
 
     domains_list: list[str] | None = None
@@ -28,6 +34,10 @@ class SiteConfig(BaseModel):
     watch: bool = False
     verbose: bool = False
     gitlab_ci: bool = False
+    jobs: int = 4
+    blobless: bool = False
+    clone_depth: int | None = None
+    sparse: bool = False
 
 
 class StandupConfig(SiteConfig):
@@ -1,14 +1,17 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from itertools import starmap
 from os import utime
 from pathlib import Path
 from shutil import rmtree
-from subprocess import run
+from subprocess import PIPE, Popen, run
 from sys import stderr
 
 from git import Repo
 
-from ..manifest.man import ssm
+from ..manifest import man
 from . import cut
+from .cut.name_config import OUT_DIRNAME, TEMPLATE_DIRNAME
 from .ns_util import ns, ns_path, pre_existing_ns_p
 
 __all__ = [
@@ -22,48 +25,197 @@ __all__ = [
 ]
 
 
-def clone(url, as_name, wd=ns_path, update_man=True, use_git_mtime=False):
+def is_shallow(repo_dir):
+    "Whether the repo at ``repo_dir`` is a shallow clone (with truncated history)."
+    return (Path(repo_dir) / ".git" / "shallow").exists()
+
+
+def git_commit_times(repo_dir, paths, limit=False):
+    """
+    The time of the last commit to each of ``paths`` (files or directories, relative
+    to ``repo_dir``), as for ``git log -1 --format=%at -- <path>``, but for all of
+    the paths at once: from a single ``git log --name-only`` walk of the history
+    (newest first), streamed until every path has been seen. If ``limit`` is
+    ``True``, the walk is limited to the commits touching ``paths``. Paths not found
+    in the history are omitted.
+
+    In a shallow clone, the commits at the shallow boundary list every path (as they
+    are diffed against an empty tree), so the paths last changed at or before the
+    boundary are omitted, rather than given the time of the boundary commit.
+    """
+    remaining = set(paths)
+    times = {}
+    boundary = set()
+    if is_shallow(repo_dir):
+        boundary = set((Path(repo_dir) / ".git" / "shallow").read_text().split())
+    log_cmd = ["git", "--literal-pathspecs", "log", "-z", "--name-only"]
+    log_cmd += ["--no-renames", "--format=%x01%at %H"]  # no blob reads for renames
+    if limit:
+        log_cmd.append("--stdin")  # read the pathspecs (however many) from stdin
+    with Popen(log_cmd, cwd=repo_dir, stdin=PIPE, stdout=PIPE) as proc:
+        if limit:
+            pathspecs = "".join(f"{p}\n" for p in paths)
+            proc.stdin.write(os.fsencode(f"--\n{pathspecs}"))
+        proc.stdin.close()  # read in full before the walk starts, so cannot block
+        tail = b""
+        unixtime = None
+        while remaining and (chunk := proc.stdout.read(2**16)):
+            *tokens, tail = (tail + chunk).split(b"\0")
+            for token in tokens:
+                if token.startswith(b"\n"):
+                    token = token[1:]  # the names follow each commit's format line
+                if token.startswith(b"\x01"):
+                    timestamp, sha = token[1:].decode().split()
+                    unixtime = None if sha in boundary else int(timestamp)
+                    continue
+                if unixtime is None:
+                    continue  # at the shallow boundary
+                # a commit to a path is one to each of its parent directories too
+                path = os.fsdecode(token)
+                while path and path not in times:
+                    times[path] = unixtime
+                    remaining.discard(path)
+                    path = path.rpartition("/")[0]
+        proc.kill()  # stop the walk if all paths were seen before it finished
+    return {p: times[p] for p in paths if p in times}
+
+
+def restore_git_mtimes(repo_dir, deepen_by=50):
+    """
+    Set the access and modified timestamps (atime and mtime) of every file and
+    directory tracked in the repo at ``repo_dir`` (and present in its working tree,
+    so only those checked out in a sparse checkout) to the time of its last commit.
+
+    In a shallow clone, the history is deepened until it reaches the last commit
+    to each path: fetching ``deepen_by`` more commits (then twice as many each time),
+    and walking only the commits touching the paths still without a time.
+    """
+    ls_cmd = ["git", "ls-tree", "-r", "-t", "-z", "--name-only", "HEAD"]
+    listing = run(ls_cmd, cwd=repo_dir, capture_output=True, check=True).stdout
+    paths = [os.fsdecode(p) for p in listing.split(b"\0") if p]
+    paths = [p for p in paths if os.path.lexists(repo_dir / p)]
+    times = git_commit_times(repo_dir, paths)
+    missing = [p for p in paths if p not in times]
+    while missing and is_shallow(repo_dir):
+        deepen_cmd = ["git", "fetch", "--quiet", f"--deepen={deepen_by}"]
+        run(deepen_cmd, cwd=repo_dir, capture_output=True, check=True)
+        times.update(git_commit_times(repo_dir, missing, limit=True))
+        missing = [p for p in missing if p not in times]
+        deepen_by *= 2
+    if missing:
+        raise ValueError(
+            f"git log gave no commit time for {missing[0]!r} (of {len(missing)}"
+            f" paths) in {repo_dir}"
+        )
+    for path in paths:
+        utime(repo_dir / path, times=(times[path], times[path]))
+
+
+def sparse_paths(domain):
+    """
+    The directories of a domain's repo which are read (or written) when building its
+    site: its templates and static assets (for ``fold.cut``), its site output, and any
+    directories it serves (for ``fold.wire``, as per ``emitters.ini``). The files at
+    the top level of the repo (e.g. ``.gitlab-ci.yml``) are always checked out too.
+    """
+    # Delayed to avoid circular import
+    from .wire.main import read_emitters_config
+
+    c = read_emitters_config()
+    served = [*c[domain]] if c.has_section(domain) else []
+    return [TEMPLATE_DIRNAME, "static", OUT_DIRNAME, *served]
+
+
+def clone(
+    url,
+    as_name,
+    wd=ns_path,
+    update_man=True,
+    use_git_mtime=False,
+    blobless=False,
+    depth=None,
+    sparse=None,
+):
     """
     Clone a repo from ``url`` giving it the name ``as_name``. If ``use_git_mtime`` is
     ``True``, then modify the access and modified timestamps (atime and mtime) of all
     files in the git repo's working tree to be the most recent commit in the git log.
+
+    To fetch less, the clone can be a blobless partial clone (``blobless=True``: file
+    contents are only fetched as they are checked out), shallow (the last ``depth``
+    commits of each branch, so the deployment branch can still be checked out), and
+    a sparse checkout of only the directories listed in ``sparse`` (see
+    ``sparse_paths``, for those used when building a site).
     """
     clone_path = wd / as_name
-    repo = Repo.clone_from(url, to_path=clone_path)
+    _clone(url, clone_path, use_git_mtime, blobless, depth, sparse)
     ns.refresh()
-    if use_git_mtime:
-        for n in repo.tree().list_traverse():
-            filepath = clone_path / n.path
-            unixtime = repo.git.log("-1", "--format='%at'", "--", n.path).strip("'")
-            if not unixtime.isnumeric():
-                raise ValueError(
-                    f"git log gave non-numeric timestamp {unixtime} for {n.path}"
-                    f" during the cloning of {url}"
-                )
-            utime(filepath, times=(int(unixtime), int(unixtime)))
     if update_man:
-        ssm.check_manifest()
+        man.ssm.check_manifest()
     return
 
 
-def source_manifest(use_git_mtime=True):
+def _clone(
+    url, clone_path, use_git_mtime=False, blobless=False, depth=None, sparse=None
+):
+    "Clone a repo (without refreshing the namespace), restoring its mtimes if asked."
+    options = {}
+    if blobless:
+        options["filter"] = "blob:none"
+    if depth is not None:
+        options.update(depth=depth, no_single_branch=True)
+    if sparse is not None:
+        options["sparse"] = True  # only the top-level files, until the set is given
+    repo = Repo.clone_from(url, to_path=clone_path, **options)
+    if sparse is not None:
+        repo.git.sparse_checkout("set", "--cone", *sparse)
+    if use_git_mtime:
+        restore_git_mtimes(clone_path)
+
+
+def source_manifest(
+    use_git_mtime=True, jobs=4, blobless=False, depth=None, sparse=False
+):
     """
     Clone repos as per the manifest (`qu.ssm`), checking out the last branch listed in
     the branches field [space-separated names] if distributed. If ``use_git_mtime`` is
     ``True`` (the default), then modify the mtime of the cloned files with the time of
     their last commit in the git log, rather than the one created during cloning (which
     would otherwise be the current date and time).
+
+    Up to ``jobs`` repos are cloned (and have their mtimes restored) at once, in a
+    thread pool. The namespace is refreshed and the manifest checked once, after all
+    of the clones finish. A failed clone does not stop the others: each failure is
+    reported, and a dict of the exception raised for each failed domain is returned.
+
+    The clones are blobless and shallow as for ``clone`` given ``blobless`` and
+    ``depth``, and if ``sparse`` is ``True``, only the ``sparse_paths`` of each domain
+    are checked out.
     """
-    df = ssm.repos_df.loc[:, ("domain", "git_url", "branches")]
-    for domain, url, branches in df.values:
-        if (ns_path / domain).exists():
-            continue  # simply do not touch for now
-        try:
-            clone(url, as_name=domain, update_man=False, use_git_mtime=use_git_mtime)
-        except Exception as e:
-            print(f"Failed on {url}: {e}", file=stderr)
-    ssm.check_manifest()
-    return
+    pending = [r for r in man.ssm.repo_table if not (ns_path / r.domain).exists()]
+    # (existing repos are simply not touched for now)
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {
+            pool.submit(
+                _clone,
+                r.git_url,
+                ns_path / r.domain,
+                use_git_mtime,
+                blobless,
+                depth,
+                sparse_paths(r.domain) if sparse else None,
+            ): r
+            for r in pending
+        }
+        for future in as_completed(futures):
+            repo = futures[future]
+            if (e := future.exception()) is not None:
+                print(f"Failed on {repo.git_url}: {e}", file=stderr)
+                errors[repo.domain] = e
+    ns.refresh()
+    man.ssm.check_manifest()
+    return errors
 
 
 class GitNews:
@@ -114,7 +266,7 @@ class GitNews:
 
 def preprocess_domains_list(specific_domains):
     if specific_domains is None:
-        domains = ssm.repos_df.domain
+        domains = man.ssm.repo_table.column("domain")
     else:
         if type(specific_domains) is list:
             domains = specific_domains
@@ -161,7 +313,7 @@ def remote_push_manifest(
             origin = repo.remotes.origin
             origin.push(refspec=refspec)
             print(f"⇢ Pushing ⠶ {origin.name}", file=stderr)
-    ssm.check_manifest()
+    man.ssm.check_manifest()
     return
 
 
@@ -186,7 +338,7 @@ def remote_pull_manifest(specific_domains=None):
         origin = repo.remotes.origin
         origin.pull()  # not checked if returned Pull object stores useful info
         print(f"⇢ Pulling ⠶ {origin.name}", file=stderr)
-    ssm.check_manifest()
+    man.ssm.check_manifest()
     return
 
 
@@ -272,5 +424,5 @@ def stash_transfer_site_manifest(
             print(f"⇢ Pushing ⠶ {origin.name} ({checkout_branch})", file=stderr)
         if reset_branch:
             repo.git.checkout(initial_repo_branch)
-    ssm.check_manifest()
+    man.ssm.check_manifest()
     return
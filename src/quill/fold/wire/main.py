@@ -6,7 +6,27 @@ from pathlib import Path
 from ..ns_util import ns, ns_path
 from .emitters import Emitter
 
-__all__ = ["standup"]
+__all__ = ["standup", "read_emitters_config", "serving_dirs"]
+
+emitters_ini = Path(__file__).parent / "emitters.ini"
+
+
+def read_emitters_config() -> ConfigParser:
+    c = ConfigParser()
+    with open(emitters_ini, "r") as f:
+        c.read_file(f, emitters_ini.name)
+    return c
+
+
+def serving_dirs() -> dict[str, Path]:
+    """
+    The directory from which each served domain is emitted (as `standup` would
+    configure it, but without checking that the directories exist).
+    """
+    c = read_emitters_config()
+    return {
+        domain: ns_path / domain / name for domain in c.sections() for name in c[domain]
+    }
 
 
 def standup(
@@ -14,11 +34,7 @@ def standup(
     dry_config: bool = False,
     verbose: bool = False,
 ):
-    ini_fn = "emitters.ini"
-    ini_dir = Path(__file__).parent
-    c = ConfigParser()
-    with open(ini_dir / ini_fn, "r") as f:
-        c.read_file(f, ini_fn)
+    c = read_emitters_config()
     emitters = {}
     if domains_list is None:
         domains_list = [*ns]
@@ -3,7 +3,7 @@ from sys import stderr
 
 from yaml import Loader, load
 
-from ..manifest.man import ssm
+from ..manifest import man
 from .ns_util import ns, ns_path
 from .site_yaml import SiteCI
 
@@ -21,11 +21,10 @@ def yaml_manifests(as_dicts=False, yaml_filename=YAML_FNAME):
     """
     Clone repos as per the manifest (`qu.ssm`)
     """
-    ssm.check_manifest()
-    df = ssm.repos_df.loc[:, ("domain", "local")]
+    statuses = man.ssm.check_manifest()
     manifest_dict = {}
-    for domain, local in df.values:
-        if local:
+    for domain in man.ssm.repo_table.column("domain"):
+        if domain in statuses:  # i.e. local
             local_path = ns_path / domain
             yaml_path = local_path / yaml_filename
             d = yaml2dict(yaml_path)
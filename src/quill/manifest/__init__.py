@@ -1,2 +1,7 @@
+from ..__share__ import lazy_getattr
+from . import man, namings
 from .man import *
 from .namings import *
+
+lazy_attrs = {**man.lazy_attrs, **namings.lazy_attrs}
+__getattr__ = lazy_getattr(__name__, lazy_attrs)
@@ -1,13 +1,20 @@
+from ..__share__ import MtimeCached, lazy_getattr
 from ..fold import ns_path as ss
 from ..scan import mmd
 from ..scan.lever.lists import SepBlockList
-from .parsing import read_man
 
-__all__ = ["ssm"]
+__all__ = []  # `ssm` is lazy (see below), so is not star-exported
 
 ssm_p = ss / "manifest.mmd"
 pk = ("domain", "repo_name", "branches")
 sep_config = {"sep": ":", "headersep": True, "labels": None}  # don't need attrs
 config_dict = {"listclass": SepBlockList, "part_keys": pk, "listconfig": sep_config}
-ssm = mmd(ssm_p, listparseconfig=config_dict)
-ssm.repos = property(read_man).__get__(ssm)
+
+
+def load_ssm():
+    return mmd(ssm_p, listparseconfig=config_dict)
+
+
+# `ssm` is parsed on first use (and again if the manifest is edited)
+lazy_attrs = {"ssm": MtimeCached(load_ssm, ssm_p)}
+__getattr__ = lazy_getattr(__name__, lazy_attrs)
@@ -1,21 +1,34 @@
-from pandas import concat
-
+from ..__share__ import MtimeCached, lazy_getattr
 from ..fold import ns_path
 from ..scan.io import mmd
+from ..scan.lever.lists import iter_sep_list_rows
+from .tables import AliasTable
 
-__all__ = ["m", "alias_df"]
+__all__ = []  # `m`, `alias_table` and `alias_df` are lazy, so are not star-exported
 
+alias_p = ns_path / "alias.mmd"
 pk = ["domain", "alias"]  # `labels` to name df cols and `part_keys` for attr names
 cfg = {"sep": "=", "headersep": True, "labels": pk, "part_keys": pk}
-m = mmd(ns_path / "alias.mmd", listparseconfig=cfg)
-# aliases = {l.header.contents: [n.contents for n in l.nodes] for l in m.lists}
-alias_df = {
-    (l.header.domain, l.header.alias): l.as_df(forbid_header=True) for l in m.lists
+
+
+def load_aliases():
+    return mmd(alias_p, listparseconfig=cfg)
+
+
+def load_alias_table():
+    # namespace_full and namespace from each list's header (`domain=alias`)
+    m = lazy_attrs["m"].get()
+    return AliasTable(iter_sep_list_rows(m.lists, n_header=2))
+
+
+def load_alias_df():
+    return lazy_attrs["alias_table"].get().as_df()
+
+
+# Parsed on first use (and again if the aliases are edited)
+lazy_attrs = {
+    "m": MtimeCached(load_aliases, alias_p),
+    "alias_table": MtimeCached(load_alias_table, alias_p),
+    "alias_df": MtimeCached(load_alias_df, alias_p),
 }
-for k in alias_df:
-    ns_long, ns_short = k
-    alias_df.get(k).insert(0, "namespace", ns_short)
-    alias_df.get(k).insert(0, "namespace_full", ns_long)
-alias_df = concat(alias_df.values()).reset_index().drop(columns="index")
-alias_df.namespace = alias_df.namespace.astype("category")
-alias_df.namespace_full = alias_df.namespace_full.astype("category")
+__getattr__ = lazy_getattr(__name__, lazy_attrs)
@@ -1,4 +1,6 @@
-__all__ = ["parse_man_node", "read_man"]
+from .tables import RepoTable
+
+__all__ = ["parse_man_node", "read_man", "read_man_table"]
 
 
 def parse_man_node(node, host="gitlab.com", hosting_at="gitlab.io"):
@@ -29,9 +31,25 @@ def read_man(man):
     return repo_info
 
 
-def read_man_df(man):
+def read_man_table(man):
+    "Table of the manifest's repos (a `RepoTable`, with each repo's git remote URL)."
     repo_info = read_man(man)
-    df = man.as_df()
-    git_addr = [x[1] for x in repo_info]
-    df["git_url"] = git_addr
+    return RepoTable(
+        (*parts, git_url) for parts, (_, git_url) in zip(man.all_parts, repo_info)
+    )
+
+
+def read_man_df(man):
+    """
+    DataFrame of the manifest's `repo_table`, with the `branch`, `local` and `clean`
+    columns of each repo's git status if recorded by `check_manifest` (`None` for
+    repos which are not local).
+    """
+    df = man.repo_table.as_df()
+    statuses = man.__dict__.get("repo_status")
+    if statuses is not None:
+        domains = man.repo_table.column("domain")
+        df["branch"] = [statuses[d].branch if d in statuses else None for d in domains]
+        df["local"] = [d in statuses for d in domains]
+        df["clean"] = [statuses[d].clean if d in statuses else None for d in domains]
     return df
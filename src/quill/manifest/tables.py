@@ -0,0 +1,125 @@
+from typing import NamedTuple
+
+from ..scan.lever.lists import columns_to_df
+
+__all__ = [
+    "RecordTable",
+    "AliasRecord",
+    "AliasTable",
+    "RouteRecord",
+    "RouteTable",
+    "RepoRecord",
+    "RepoTable",
+]
+
+
+class RecordTable(tuple):
+    """
+    Immutable table of typed records (instances of the `NamedTuple` class `record`),
+    with a dict index on each of the `index_fields`, so the small namespace tables
+    can be looked up by field value without pandas. A DataFrame of the records is
+    only built upon request, by `as_df` (coercing any columns named in `dtypes`).
+    """
+
+    record = None
+    index_fields = ()
+    dtypes = None
+
+    def __new__(cls, rows=()):
+        return super().__new__(cls, (cls.record._make(row) for row in rows))
+
+    def __init__(self, rows=()):
+        self.indexes = {field: {} for field in self.index_fields}
+        for r in self:
+            for field, index in self.indexes.items():
+                index.setdefault(getattr(r, field), []).append(r)
+
+    def where(self, **criteria):
+        """
+        The table of the records whose fields equal the given values, e.g.
+        `where(namespace="∫", domain="log")`, looked up in the index of the first
+        indexed field given (and compared field by field for any others).
+        """
+        indexed = [f for f in criteria if f in self.indexes]
+        if indexed:
+            rows = self.indexes[indexed[0]].get(criteria[indexed[0]], [])
+        else:
+            rows = self
+        return type(self)(
+            r
+            for r in rows
+            if all(getattr(r, field) == value for field, value in criteria.items())
+        )
+
+    def get(self, **criteria):
+        """
+        The one record whose fields equal the given values (raising a `ValueError`
+        if there is not exactly one, like the pandas `item` method).
+        """
+        matches = self.where(**criteria)
+        if len(matches) != 1:
+            raise ValueError(
+                f"Expected one record where {criteria}, got {len(matches)}"
+            )
+        return matches[0]
+
+    def column(self, field):
+        "List of the values of the `field` of each record."
+        return [getattr(r, field) for r in self]
+
+    def values(self, field):
+        "The distinct values of an indexed `field` (in order of first appearance)."
+        return list(self.indexes[field])
+
+    def as_df(self):
+        columns = [self.column(field) for field in self.record._fields]
+        return columns_to_df(columns, self.record._fields, self.dtypes)
+
+    def __repr__(self):
+        s = "s" if len(self) != 1 else ""
+        return f"{type(self).__name__} of {len(self)} {self.record.__name__}{s}"
+
+
+class AliasRecord(NamedTuple):
+    "A domain (and its alias, or an empty string) in a namespace (see `alias.mmd`)."
+
+    namespace_full: str
+    namespace: str
+    domain: str
+    alias: str
+
+
+class AliasTable(RecordTable):
+    record = AliasRecord
+    index_fields = ("namespace", "domain", "alias")
+    dtypes = {"namespace_full": "category", "namespace": "category"}
+
+
+class RouteRecord(NamedTuple):
+    "An aliased domain and its route (a filesystem path, see `routing.mmd`)."
+
+    namespace_full: str
+    namespace: str
+    domain: str
+    alias: str
+    route: str
+
+
+class RouteTable(RecordTable):
+    record = RouteRecord
+    index_fields = ("namespace", "domain")
+    dtypes = {"namespace_full": "category", "namespace": "category"}
+
+
+class RepoRecord(NamedTuple):
+    "A domain's repo in the manifest (see `manifest.mmd`) and its git remote URL."
+
+    domain: str
+    repo_name: str
+    branches: str
+    git_url: str
+
+
+class RepoTable(RecordTable):
+    record = RepoRecord
+    index_fields = ("domain",)
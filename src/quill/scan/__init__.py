@@ -1,3 +1,9 @@
+from ..__share__ import lazy_getattr
+from . import address
 from .address import *
+from .index import *
 from .io import *
 from .lever import *
+
+lazy_attrs = address.lazy_attrs
+__getattr__ = lazy_getattr(__name__, lazy_attrs)
@@ -1,2 +1,9 @@
+from ...__share__ import lazy_getattr
+from . import routing
+from .datetree import *
 from .paths import *
+from .resolver import *
 from .routing import *
+
+lazy_attrs = routing.lazy_attrs
+__getattr__ = lazy_getattr(__name__, lazy_attrs)
@@ -0,0 +1,208 @@
+import os
+import re
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+from .paths import MonthInt
+
+__all__ = ["DateTree"]
+
+# The directory levels below a domain's directory, e.g. `20/10oct/25/0_name.mmd`
+level_res = [
+    re.compile(r"(\d{2})$"),  # 2-digit year
+    re.compile(r"(\d{2})([a-z]{3})$"),  # month number and abbreviation
+    re.compile(r"(\d{1,2})$"),  # day
+]
+fileint_re = re.compile(r"\d+")
+END = float("inf")  # sorts after any number, to close a prefix range of keys
+
+
+def _child_key(key, level, match):
+    "The key of a directory at `level` below the directory at `key`."
+    if level == 0:
+        return (2000 + int(match.group(1)),)
+    elif level == 1:
+        month = int(match.group(1))
+        if MonthInt._value2member_map_.get(month) is None:
+            return None
+        return (*key, month)
+    day = int(match.group(1))
+    return (*key, day) if 1 <= day <= 31 else None
+
+
+class DateTree:
+    """
+    Index of the dated files in a domain's directory tree (`yy/MMmmm/dd/`, files
+    numbered by the leading digits of their names), built in one sweep of
+    `os.scandir` calls. Each file is keyed by `(year, month, day, fileint)` (as
+    integers, with the full year), mapping to its path and back, and the keys are
+    kept sorted for prefix (year, month or day) and date range queries.
+
+    The mtime of each directory at its last scan is kept, so `refresh` only rescans
+    the directories whose entries have since changed, and a lookup of a single file
+    only checks the mtime of its day directory.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.dirs = {}  # each scanned directory: (level, key, mtime_ns, children)
+        self.days = {}  # (year, month, day): day directory path
+        self.files = {}  # (year, month, day): {fileint: [paths]}
+        self.keys = {}  # path: (year, month, day, fileint)
+        self._sorted = None
+        self.refresh()
+
+    def _scan(self, path, level, key):
+        "(Re)scan the directory at `path`, scanning any new subdirectories in turn."
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = [(e.name, e.is_dir()) for e in it]
+        except (FileNotFoundError, NotADirectoryError):
+            self._drop(path)
+            return
+        old = self.dirs.get(path)
+        if level == 3:
+            self._drop_files(key)
+            self.days[key] = path
+            numbered = {}
+            for name, is_dir in sorted(entries):
+                if not is_dir and (m := fileint_re.match(name)):
+                    file_path = path / name
+                    file_key = (*key, int(m.group()))
+                    numbered.setdefault(file_key[-1], []).append(file_path)
+                    self.keys[file_path] = file_key
+            self.files[key] = numbered
+            self.dirs[path] = (level, key, mtime, [])
+            self._sorted = None
+            return
+        children = []
+        for name, is_dir in entries:
+            if is_dir and (m := level_res[level].match(name)):
+                child_key = _child_key(key, level, m)
+                if child_key is not None:
+                    children.append(path / name)
+                    if path / name not in self.dirs:
+                        self._scan(path / name, level + 1, child_key)
+        if old is not None:
+            for gone in set(old[3]).difference(children):
+                self._drop(gone)
+        self.dirs[path] = (level, key, mtime, children)
+
+    def _drop_files(self, day_key):
+        for paths in self.files.pop(day_key, {}).values():
+            for p in paths:
+                self.keys.pop(p, None)
+        self._sorted = None
+
+    def _drop(self, path):
+        "Drop a directory (and everything below it) from the index."
+        entry = self.dirs.pop(path, None)
+        if entry is None:
+            return
+        level, key, _, children = entry
+        if level == 3:
+            self._drop_files(key)
+            if self.days.get(key) == path:
+                del self.days[key]
+        for child in children:
+            self._drop(child)
+
+    def _check(self, path):
+        "Rescan the directory at `path` if its mtime changed (`False` if it is gone)."
+        level, key, mtime, _ = self.dirs[path]
+        try:
+            changed = os.stat(path).st_mtime_ns != mtime
+        except FileNotFoundError:
+            self._drop(path)
+            return False
+        if changed:
+            self._scan(path, level, key)
+        return True
+
+    def refresh(self):
+        "Rescan the directories whose mtime changed since they were last scanned."
+        if self.root not in self.dirs:
+            self._scan(self.root, 0, ())
+            return
+        for path in list(self.dirs):
+            if path in self.dirs:  # (unless dropped with its parent)
+                self._check(path)
+
+    @property
+    def sorted_keys(self):
+        if self._sorted is None:
+            self._sorted = sorted(
+                (*day, fileint)
+                for day, files in self.files.items()
+                for fileint in files
+            )
+        return self._sorted
+
+    def day_dir(self, year, month, day):
+        "The directory of a day (else `None`)."
+        return self.days.get((year, month, day))
+
+    def file(self, year, month, day, fileint):
+        """
+        The path of the file numbered `fileint` on a day (the first by name, if there
+        are several), checking its day directory is unchanged and otherwise refreshing
+        the index before raising `FileNotFoundError` if there is no such file.
+        """
+        day_key = (year, month, day)
+        daydir = self.days.get(day_key)
+        if daydir is None or not self._check(daydir):
+            self.refresh()  # a new day directory, or a removed one
+        paths = self.files.get(day_key, {}).get(fileint)
+        if not paths:
+            if day_key not in self.days:
+                raise FileNotFoundError(f"No directory for {day_key} in {self.root}")
+            raise FileNotFoundError(
+                f"No file numbered {fileint} in {self.days[day_key]}"
+            )
+        return paths[0]
+
+    def key_of(self, path):
+        "The `(year, month, day, fileint)` key of the file at `path` (reverse lookup)."
+        path = Path(path)
+        if path not in self.keys:
+            self.refresh()
+        if path not in self.keys:
+            raise KeyError(f"{path} is not a dated file in {self.root}")
+        return self.keys[path]
+
+    def _items(self, lo, hi):
+        keys = self.sorted_keys
+        return [
+            (key, path)
+            for key in keys[bisect_left(keys, lo) : bisect_right(keys, hi)]
+            for path in self.files[key[:3]][key[3]]
+        ]
+
+    def prefix(self, *date_parts):
+        """
+        List of `(key, path)` of the files under a year, month or day, given as
+        `(year[, month[, day]])` (or every file, given none), in key order.
+        """
+        return self._items(date_parts, (*date_parts, END))
+
+    def between(self, start, end):
+        """
+        List of `(key, path)` of the files dated from `start` to `end` (inclusive),
+        each a `(year, month, day)` tuple or `datetime.date`, in key order.
+        """
+        start, end = (
+            (d.year, d.month, d.day) if hasattr(d, "year") else tuple(d)
+            for d in (start, end)
+        )
+        return self._items(start, (*end, END))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        s = "s" if len(self) != 1 else ""
+        return (
+            f"Date tree of {len(self)} file{s} over {len(self.days)} days"
+            f" at {self.root}"
+        )
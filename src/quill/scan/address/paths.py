@@ -1,8 +1,6 @@
 from enum import Enum, IntEnum
 
-from ...fold import ns_path
-from ...manifest.namings import alias_df
-from .routing import routing_df
+from ...manifest import namings
 
 __all__ = ["AddressPath"]
 
@@ -143,47 +141,14 @@ def pop_part(part_list):
 
 
 def interpret_filepath(address_path):
-    if type(address_path) is str:
-        address_path = AddressPath(address_path)
-    namespace = address_path.namespace
-    domain = address_path.domain
-    route_query = f"namespace == '{namespace}' and domain == '{domain}'"
-    # route_result = routing_df.query(route_query)
-    custom_route = routing_df.query(route_query).route.item()
-    route = custom_route if custom_route else domain
-    domain_filepath = (ns_path / route).resolve()
-    has_y, has_m, has_d, has_f = [
-        hasattr(address_path, attrib) for attrib in "year month day fileint".split()
-    ]
+    """
+    Resolve an address (a string or `AddressPath`) to a path, with the resolver of
+    the current alias and routing tables (see `AddressResolver`).
+    """
     # Delayed to avoid circular import
-    from ...fold.wire import standup
-
-    standup_config = standup(domains_list=[domain], dry_config=True, verbose=False)
-    if domain in standup_config:
-        # The domain is being served, so get the directory from which it is served
-        domain_filepath = standup_config.get(domain).get("directory")
-    if has_y:
-        yeardir = domain_filepath / address_path.year
-        if has_m:
-            month_str = f"{address_path.month.int:02d}{address_path.month.as_str}"
-            monthdir = yeardir / month_str
-            if has_d:
-                daydir = monthdir / address_path.day
-                if has_f:
-                    if daydir.is_dir():
-                        # Will raise StopIteration exception if glob comes back empty
-                        p = next(daydir.glob(f"{address_path.fileint}*"))
-                    else:
-                        raise FileNotFoundError(f"Expected a directory at {daydir}")
-                else:
-                    p = daydir
-            else:
-                p = monthdir
-        else:
-            p = yeardir
-    else:
-        p = domain_filepath
-    return p
+    from .resolver import resolve_address
+
+    return resolve_address(address_path)
 
 
 class AddressPath(list):
@@ -227,23 +192,23 @@ class AddressPath(list):
         if strict:
             assert len(pp) in (2, 5, 6), f"Bad address length: {len(pp)}"
         ns = pp.pop(0)  # Permit IndexError here if parts is an empty list
-        assert ns in alias_df.namespace.cat.categories, f"Bad namespace: '{ns}'"
+        alias_table = namings.alias_table
+        assert ns in alias_table.indexes["namespace"], f"Bad namespace: '{ns}'"
         self.namespace = AddressParts.NameSpace.value(ns)
         self.append(self.namespace)  # append typed string to path
-        ns_query = f"namespace == '{self.namespace}'"
         if isinstance(d := pop_part(pp), IndexError):
             if strict:
                 raise d  # we strictly want a domain in the address
             else:
                 return  # reached end of the parts list so finish parsing without error
-        elif d in (ns_df := alias_df.query(ns_query)).alias.to_list():
+        elif aliased := (ns_table := alias_table.where(namespace=ns)).where(alias=d):
             alias = AddressParts.DomainAlias.value(d)
             # note the following will raise ValueError if multiple dealiased values
-            [dealiased] = ns_df[ns_df.alias == d].domain.to_list()
+            [dealiased] = aliased.column("domain")
             domain = AddressParts.Domain.value(dealiased)
             self.domain, self.domain_alias = dealiased, alias
             self.append(self.domain_alias)
-        elif d in ns_df.domain.to_list():
+        elif ns_table.where(domain=d):
             domain = AddressParts.Domain.value(d)
             # if an alias exists but isn't being used, just ignore it here (as `None`)
             self.domain, self.domain_alias = domain, None
@@ -287,9 +252,17 @@ class AddressPath(list):
             self.extend(pp)  # just... add extra to path untyped? ¯\_(ツ)_/¯
         return
 
+    @classmethod
+    def from_filepath(cls, filepath):
+        "The address of a dated file (the reverse of `filepath`)."
+        # Delayed to avoid circular import
+        from .resolver import default_resolver
+
+        return cls(default_resolver().address_of(filepath))
+
     @classmethod
     def from_parts(cls, domain, ymd=None, n=None, sep="⠶"):
-        ns = alias_df[alias_df.domain.eq(domain)].namespace.item()
+        ns = namings.alias_table.get(domain=domain).namespace
         path_parts = [ns, domain]
         if ymd:
             y, m, d = map(str, ymd)
@@ -0,0 +1,210 @@
+from pathlib import Path
+
+from ...fold import ns_path
+from ...manifest import namings
+from . import routing
+from .datetree import DateTree
+from .paths import MonthInt
+
+__all__ = ["AddressResolver", "resolve_address", "resolve_addresses"]
+
+
+class AddressResolver:
+    """
+    Resolver of address strings (e.g. `∫⠶log⠶20⠶10⠶25⠶0`, see `AddressPath`) to
+    filesystem paths, compiled once from the alias and routing tables (as dicts from
+    namespace and domain or alias to domain, and to route) and the serving directories
+    of the emitters config (read once, rather than upon each address). The parse of
+    each address string and the directory of each domain are cached, and the dated
+    files of each domain are indexed (see `DateTree`), so resolving an address (or
+    a path back to its address) is a dict lookup.
+    """
+
+    def __init__(self, alias_table=None, routing_table=None, serving=None, sep="⠶"):
+        if alias_table is None:
+            alias_table = namings.alias_table
+        if routing_table is None:
+            routing_table = routing.routing_table
+        if serving is None:
+            # Delayed to avoid circular import
+            from ...fold.wire.main import serving_dirs
+
+            serving = serving_dirs()
+        self.alias_table = alias_table
+        self.routing_table = routing_table
+        self.serving = serving
+        self.sep = sep
+        self.namespaces = set(alias_table.indexes["namespace"])
+        self.domains = {(a.namespace, a.domain): a.domain for a in alias_table}
+        for a in alias_table:
+            if a.alias:  # an alias takes precedence over a domain of the same name
+                self.domains[(a.namespace, a.alias)] = a.domain
+        self.routes = {}
+        for r in routing_table:
+            self.routes.setdefault((r.namespace, r.domain), []).append(r.route)
+        self._domain_dirs = {}
+        self._dir_domains = None
+        self._parsed = {}
+        self._trees = {}
+
+    def domain_dir(self, namespace, domain):
+        "The directory of a domain: where it is served from, else its route."
+        key = (namespace, domain)
+        if key not in self._domain_dirs:
+            routes = self.routes.get(key, [])
+            if len(routes) != 1:
+                raise ValueError(f"Expected one route for {key}, got {len(routes)}")
+            [custom_route] = routes
+            route = custom_route if custom_route else domain
+            if domain in self.serving:
+                self._domain_dirs[key] = self.serving[domain]
+            else:
+                self._domain_dirs[key] = (ns_path / route).resolve()
+        return self._domain_dirs[key]
+
+    @property
+    def dir_domains(self):
+        """
+        Dict of the directory of each domain to its `(namespace, domain)` (built upon
+        first access), skipping any domain without exactly one route.
+        """
+        if self._dir_domains is None:
+            self._dir_domains = {}
+            for namespace, domain in self.routes:
+                try:
+                    directory = self.domain_dir(namespace, domain)
+                except ValueError:
+                    continue  # (so paths in other domains still resolve)
+                self._dir_domains.setdefault(directory, (namespace, domain))
+        return self._dir_domains
+
+    def date_tree(self, directory):
+        "The `DateTree` of a domain directory (built on first use)."
+        if directory not in self._trees:
+            self._trees[directory] = DateTree(directory)
+        return self._trees[directory]
+
+    def parse(self, address, lengths=(2, 5, 6)):
+        """
+        Parse an address string to its namespace, (dealiased) domain, the integer
+        `(year, month, day, fileint)` parts it has, and those parts as given (cached
+        by address string).
+        """
+        key = (address, lengths)
+        if (parsed := self._parsed.get(key)) is not None:
+            return parsed
+        parts = address.split(self.sep)
+        assert len(parts) in lengths, f"Bad address length: {len(parts)}"
+        namespace, name, *date_parts = parts
+        assert namespace in self.namespaces, f"Bad namespace: '{namespace}'"
+        domain = self.domains.get((namespace, name))  # dealiased
+        if domain is None:
+            raise ValueError(f"Couldn't parse address {namespace}⠶{name}")
+        date_key = []
+        if date_parts:
+            y = date_parts[0]
+            assert len(y) == 2, f"Expected a 2-digit string, got '{y}'"
+            date_key.append(2000 + int(y))
+        if len(date_parts) > 1:
+            m = date_parts[1]
+            month = MonthInt(int(m)) if m.isnumeric() else MonthInt[m]
+            date_key.append(month.value)
+        if len(date_parts) > 2:
+            d = int(date_parts[2])
+            assert 1 <= d <= 31, f"Expected day number from 1-31, got {d}"
+            date_key.append(d)
+        if len(date_parts) > 3:
+            date_key.append(int(date_parts[3]))  # the file number
+        parsed = (namespace, domain, tuple(date_key), date_parts)
+        self._parsed[key] = parsed
+        return parsed
+
+    def resolve(self, address):
+        """
+        Resolve an address (a string, or an `AddressPath`) to the path of its domain
+        directory (2 parts), day directory (5 parts) or file (6 parts), looked up in
+        the `DateTree` of the domain directory.
+        """
+        if not isinstance(address, str):
+            address = self.sep.join(address)
+        namespace, domain, date_key, date_parts = self.parse(address)
+        directory = self.domain_dir(namespace, domain)
+        if not date_key:
+            return directory
+        tree = self.date_tree(directory)
+        if len(date_key) == 4:
+            return tree.file(*date_key)
+        if (daydir := tree.day_dir(*date_key)) is not None:
+            return daydir
+        y, _, d = date_parts  # the day directory to expect, as it is not indexed
+        month = MonthInt(date_key[1])
+        return directory / y / f"{month.value:02d}{month.name}" / d
+
+    def query(self, address):
+        """
+        The paths of the files under an address prefix of a domain, year, month or
+        day (e.g. `∫⠶log⠶20⠶10` for every file in October 2020), in date order.
+        """
+        namespace, domain, date_key, _ = self.parse(address, lengths=(2, 3, 4, 5))
+        tree = self.date_tree(self.domain_dir(namespace, domain))
+        tree.refresh()
+        return [path for _, path in tree.prefix(*date_key)]
+
+    def between(self, address, start, end):
+        """
+        The paths of the files of a domain (e.g. `∫⠶log`) dated from `start` to `end`
+        (inclusive, each a `(year, month, day)` tuple or `datetime.date`).
+        """
+        namespace, domain, _, _ = self.parse(address, lengths=(2,))
+        tree = self.date_tree(self.domain_dir(namespace, domain))
+        tree.refresh()
+        return [path for _, path in tree.between(start, end)]
+
+    def address_of(self, path):
+        "The address of a dated file (reverse resolution), e.g. `∫⠶log⠶20⠶10⠶25⠶0`."
+        path = Path(path)
+        dir_domains = self.dir_domains
+        for directory in path.parents:
+            if directory in dir_domains:
+                namespace, domain = dir_domains[directory]
+                year, month, day, fileint = self.date_tree(directory).key_of(path)
+                date_parts = [f"{year % 100:02d}", f"{month:02d}", f"{day:02d}"]
+                return self.sep.join([namespace, domain, *date_parts, str(fileint)])
+        raise ValueError(f"{path} is not in the directory of any domain")
+
+    def resolve_many(self, addresses):
+        "Resolve each of the `addresses` (see `resolve`), returning a list of paths."
+        resolve = self.resolve
+        return [resolve(a) for a in addresses]
+
+    def __repr__(self):
+        return (
+            f"Address resolver for {len(self.domains)} domains and aliases"
+            f" in {len(self.namespaces)} namespaces"
+        )
+
+
+_resolver = None
+
+
+def default_resolver():
+    "The resolver of the current alias and routing tables (rebuilt if they change)."
+    global _resolver
+    alias_table, routing_table = namings.alias_table, routing.routing_table
+    if (
+        _resolver is None
+        or _resolver.alias_table is not alias_table
+        or _resolver.routing_table is not routing_table
+    ):
+        _resolver = AddressResolver(alias_table, routing_table)
+    return _resolver
+
+
+def resolve_address(address):
+    "Resolve an address to a path, with the `default_resolver`."
+    return default_resolver().resolve(address)
+
+
+def resolve_addresses(addresses):
+    "Resolve many addresses to paths, with the `default_resolver`."
+    return default_resolver().resolve_many(addresses)
@@ -1,23 +1,38 @@
-from pandas import concat
-
+from ...__share__ import MtimeCached, lazy_getattr
 from ...fold import ns_path
-from ...manifest.namings import alias_df
+from ...manifest import namings
+from ...manifest.tables import RouteTable
 from ..io import mmd
+from ..lever.lists import iter_sep_list_rows
 
-__all__ = ["routing_df"]
-
-assert (routing_mmd := ns_path / "routing.mmd").exists(), f"No file {routing_mmd=}"
+__all__ = []  # `routing_table` and `routing_df` are lazy, so are not star-exported
 
+routing_p = ns_path / "routing.mmd"
 pk = ["domain", "route"]  # route is 'dev' or 'local' relative filesystem path
 cfg = {"sep": "=", "headersep": False, "labels": pk, "part_keys": pk}
-r = mmd(routing_mmd, listparseconfig=cfg)
-routing_df = {l.header.contents: l.as_df(forbid_header=True) for l in r.lists}
-for routing_ns in routing_df:
-    routing_df.get(routing_ns).insert(0, "namespace_full", routing_ns)
-routing_df = (
-    concat([routing_df.get(ns) for ns in routing_df])
-    .reset_index()
-    .drop(columns="index")
-)
-routing_df.namespace_full = routing_df.namespace_full.astype("category")
-routing_df = alias_df.merge(routing_df, on=["namespace_full", "domain"])
+
+
+def load_routing_table():
+    "The aliases with their routes, joined on the full namespace and domain."
+    r = mmd(routing_p, listparseconfig=cfg)
+    routes = {}
+    for namespace_full, domain, route in iter_sep_list_rows(r.lists, n_header=1):
+        routes.setdefault((namespace_full, domain), []).append(route)
+    return RouteTable(
+        (*a, route)
+        for a in namings.alias_table
+        for route in routes.get((a.namespace_full, a.domain), [])
+    )
+
+
+def load_routing_df():
+    return lazy_attrs["routing_table"].get().as_df()
+
+
+# Parsed on first use (and again if routes or aliases are edited)
+sources = (routing_p, namings.alias_p)
+lazy_attrs = {
+    "routing_table": MtimeCached(load_routing_table, *sources),
+    "routing_df": MtimeCached(load_routing_df, *sources),
+}
+__getattr__ = lazy_getattr(__name__, lazy_attrs)
@@ -0,0 +1,118 @@
+import gc
+import os
+import pickle
+from contextlib import suppress
+from hashlib import blake2b
+from pathlib import Path
+
+__all__ = ["ParseCache", "default_cache_dir"]
+
+default_cache_dir = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "quill" / "mmd"
+)
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed MMD documents, stored as one file per entry in `cache_dir`
+    (serialised by pickling, unless other `dumps` and `loads` functions are given).
+    Entries are keyed by the file's path, size, `mtime_ns` and content hash, along
+    with the parse options (e.g. the normalised `listparseconfig`), so any change to
+    the file or to how it is parsed is a miss. When the total size of the entries
+    exceeds `max_bytes`, the least recently used entries are evicted (the mtime of
+    an entry is bumped upon each hit to mark its recency).
+    """
+
+    suffix = ".entry"
+
+    def __init__(self, cache_dir=None, max_bytes=64 * 2**20):
+        self.cache_dir = Path(default_cache_dir if cache_dir is None else cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(self, filepath, content, options=None):
+        "Cache key for the file at `filepath` whose bytes are `content`."
+        st = os.stat(filepath)
+        h = blake2b(digest_size=20)
+        h.update(os.fsencode(os.path.abspath(filepath)))
+        h.update(f"|{st.st_size}|{st.st_mtime_ns}|{options!r}|".encode())
+        h.update(blake2b(content, digest_size=16).digest())
+        return h.hexdigest()
+
+    def entry_path(self, key):
+        return self.cache_dir / f"{key}{self.suffix}"
+
+    def get(self, key, loads=None):
+        """
+        The cached object for `key` (deserialised from its bytes by `loads`, else by
+        unpickling), or `None` on a miss (or if the entry cannot be loaded, in which
+        case it is removed).
+        """
+        loads = pickle.loads if loads is None else loads
+        entry = self.entry_path(key)
+        gc_enabled = gc.isenabled()
+        gc.disable()  # deserialising allocates a node per line: avoid repeated GC passes
+        try:
+            parsed = loads(entry.read_bytes())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            entry.unlink(missing_ok=True)  # corrupt or stale (e.g. from old classes)
+            return None
+        finally:
+            if gc_enabled:
+                gc.enable()
+        with suppress(FileNotFoundError):  # (unless since evicted by another process)
+            os.utime(entry)  # mark as recently used
+        return parsed
+
+    def put(self, key, parsed, dumps=None):
+        """
+        Store `parsed` under `key` (serialised to bytes by `dumps`, else by pickling,
+        and written atomically), then evict to `max_bytes`. An entry larger than
+        `max_bytes` by itself is not stored.
+        """
+        if dumps is None:
+            data = pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            data = dumps(parsed)
+        if len(data) > self.max_bytes:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self.entry_path(key)
+        tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, entry)
+        self.evict()
+
+    def entries(self):
+        "List of `(mtime_ns, size, path)` of each entry, least recently used first."
+        if not self.cache_dir.is_dir():
+            return []
+        with os.scandir(self.cache_dir) as it:
+            stats = [
+                (e.stat().st_mtime_ns, e.stat().st_size, Path(e.path))
+                for e in it
+                if e.name.endswith(self.suffix)
+            ]
+        return sorted(stats)
+
+    def evict(self):
+        "Remove the least recently used entries until the cache fits `max_bytes`."
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            path.unlink(missing_ok=True)
+
+    @property
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def __repr__(self):
+        return f"ParseCache at {self.cache_dir} ({self.size} of {self.max_bytes} bytes)"
@@ -0,0 +1,343 @@
+import os
+import pickle
+import re
+from array import array
+from hashlib import blake2b
+from io import BytesIO, TextIOWrapper
+from pathlib import Path
+from typing import NamedTuple
+
+from .cache import default_cache_dir
+from .lever import NodeTable
+from .lever.docelems import header_levels
+from .lever.tokens import prefix_by_code, prefix_codes
+
+__all__ = ["CorpusIndex", "NodeLocation", "ListLocation", "default_index_dir"]
+
+default_index_dir = default_cache_dir.parent / "index"
+
+INDEX_VERSION = 1
+word_re = re.compile(r"\w+")
+
+
+def terms_of(text):
+    "The index terms in `text`: its words, case-folded."
+    return word_re.findall(text.casefold())
+
+
+def _normalise_header(text):
+    return " ".join(text.split()).casefold()
+
+
+class NodeLocation(NamedTuple):
+    "The location of a node: its file, line number (from 1) and prefix."
+
+    path: str
+    line_no: int
+    prefix: object
+
+    def __repr__(self):
+        return f"{self.path}:{self.line_no}"
+
+
+class ListLocation(NamedTuple):
+    """
+    The location of a list: its file, the line number of its header (or `None`
+    if unheadered) and the line numbers of its items.
+    """
+
+    path: str
+    header_line_no: object
+    line_nos: tuple
+
+    def __repr__(self):
+        return f"{self.path}:{self.line_nos[0] if self.line_nos else '?'}"
+
+
+class FileIndex:
+    """
+    The index of a single MMD file, built from its `NodeTable`: the prefix code and
+    line number of each node, term postings (the indexes of the nodes containing
+    each term), the index of the innermost header whose section contains each node,
+    and the header node (and its normalised contents), first and stop node indexes
+    of each list. The file's size, `mtime_ns` and content digest are kept to tell
+    if it must be reindexed.
+    """
+
+    def __init__(self, path, size, mtime_ns, digest, table):
+        self.version = INDEX_VERSION
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        self.prefixes = array("B", table.prefixes)
+        self.line_nos = array("I", table.line_nos)
+        self.sections = array("i")  # index of the innermost header, or -1
+        self.header_nodes = array("I")  # node index of each header
+        self.header_parents = array("i")
+        self.header_texts = []  # normalised contents of each header
+        self.terms = {}
+        self.list_headers = array("i", table.list_headers)
+        self.list_starts = array("I", table.list_starts)
+        self.list_stops = array("I", table.list_stops)
+        self.list_header_texts = [
+            None if h < 0 else _normalise_header(table.contents(h))
+            for h in table.list_headers
+        ]
+        open_headers = []  # (level, header index) of the enclosing headers
+        for i in range(len(table)):
+            contents = table.contents(i)
+            for term in set(terms_of(contents)):
+                self.terms.setdefault(term, array("I")).append(i)
+            level = header_levels.get(table.prefixes[i])
+            if level is not None:
+                while open_headers and open_headers[-1][0] >= level:
+                    open_headers.pop()
+                h = len(self.header_nodes)
+                self.header_nodes.append(i)
+                self.header_parents.append(open_headers[-1][1] if open_headers else -1)
+                self.header_texts.append(_normalise_header(contents))
+                open_headers.append((level, h))
+            self.sections.append(open_headers[-1][1] if open_headers else -1)
+
+    def location(self, i):
+        return NodeLocation(
+            self.path, self.line_nos[i], prefix_by_code[self.prefixes[i]]
+        )
+
+    def headers_matching(self, header):
+        "Indexes of the headers whose (normalised) contents are `header`."
+        header = _normalise_header(header)
+        return {h for h, text in enumerate(self.header_texts) if text == header}
+
+    def under(self, i, headers):
+        "Whether the node at index `i` is in the section of any of the `headers`."
+        h = self.sections[i]
+        while h >= 0:
+            if h in headers:
+                return True
+            h = self.header_parents[h]
+        return False
+
+    def node_indices(self, terms=(), prefix_code=None, header=None):
+        "Indexes of the nodes with all of the `terms`, `prefix_code` and `header`."
+        if terms:
+            postings = [self.terms.get(t) for t in terms]
+            if not all(postings):
+                return []
+            found = set(min(postings, key=len)).intersection(*postings)
+            indices = sorted(found)
+        else:
+            indices = range(len(self.prefixes))
+        if prefix_code is not None:
+            indices = [i for i in indices if self.prefixes[i] == prefix_code]
+        if header is not None:
+            headers = self.headers_matching(header)
+            if not headers:
+                return []
+            indices = [i for i in indices if self.under(i, headers)]
+        return indices
+
+    def lists(self, header=None):
+        "Locations of the lists (only those whose header is `header`, if given)."
+        if header is not None:
+            header = _normalise_header(header)
+        lists = []
+        for l, (h, start, stop) in enumerate(
+            zip(self.list_headers, self.list_starts, self.list_stops)
+        ):
+            if header is not None and self.list_header_texts[l] != header:
+                continue
+            header_line = None if h < 0 else self.line_nos[h]
+            line_nos = tuple(self.line_nos[start:stop])
+            lists.append(ListLocation(self.path, header_line, line_nos))
+        return lists
+
+
+class CorpusIndex:
+    """
+    Persistent inverted index over a corpus of MMD files, so that the nodes which
+    mention a term, have a given prefix, or fall under a given header (and the lists
+    with a given header) can be found across all of the files without parsing them.
+
+    The index of each file (see `FileIndex`) is stored as its own entry in
+    `index_dir`, so updating the index only reparses (and rewrites the entries of)
+    the files whose size or `mtime_ns` changed, and only if their content hash
+    differs too. A term index over the files is kept in memory to skip the files
+    which cannot match. Queries return `NodeLocation` and `ListLocation` tuples.
+    """
+
+    suffix = ".idx"
+
+    def __init__(self, index_dir=None):
+        self.index_dir = Path(default_index_dir if index_dir is None else index_dir)
+        self.files = {}
+        self.files_by_term = {}
+        self.load()
+
+    def entry_path(self, path):
+        name = blake2b(os.fsencode(path), digest_size=16).hexdigest()
+        return self.index_dir / f"{name}{self.suffix}"
+
+    def load(self):
+        "Load the stored file indexes (dropping any unreadable or outdated entries)."
+        self.files.clear()
+        self.files_by_term.clear()
+        if not self.index_dir.is_dir():
+            return
+        with os.scandir(self.index_dir) as it:
+            entries = [Path(e.path) for e in it if e.name.endswith(self.suffix)]
+        for entry in entries:
+            try:
+                file_index = pickle.loads(entry.read_bytes())
+            except Exception:
+                file_index = None
+            if getattr(file_index, "version", None) != INDEX_VERSION:
+                entry.unlink(missing_ok=True)
+                continue
+            self._add(file_index)
+
+    def _add(self, file_index):
+        self.files[file_index.path] = file_index
+        for term in file_index.terms:
+            self.files_by_term.setdefault(term, set()).add(file_index.path)
+
+    def _discard(self, path):
+        file_index = self.files.pop(path, None)
+        if file_index is None:
+            return
+        for term in file_index.terms:
+            paths = self.files_by_term[term]
+            paths.discard(path)
+            if not paths:
+                del self.files_by_term[term]
+
+    def _store(self, file_index):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        entry = self.entry_path(file_index.path)
+        tmp = entry.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(pickle.dumps(file_index, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, entry)
+
+    def update_file(self, filepath):
+        """
+        Index the file at `filepath` if it is new or changed. Returns `True` if it
+        was (re)indexed, `False` if its stored index was up to date.
+        """
+        path = os.path.abspath(filepath)
+        st = os.stat(path)
+        file_index = self.files.get(path)
+        if file_index is not None and (file_index.size, file_index.mtime_ns) == (
+            st.st_size,
+            st.st_mtime_ns,
+        ):
+            return False
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = blake2b(content, digest_size=16).digest()
+        if file_index is not None and file_index.digest == digest:
+            file_index.size, file_index.mtime_ns = st.st_size, st.st_mtime_ns
+            self._store(file_index)  # touched but unchanged: just record the stat
+            return False
+        # decode as `open` would in text mode (i.e. with universal newlines)
+        lines = TextIOWrapper(BytesIO(content)).readlines()
+        file_index = FileIndex(
+            path, st.st_size, st.st_mtime_ns, digest, NodeTable(lines)
+        )
+        self._discard(path)
+        self._add(file_index)
+        self._store(file_index)
+        return True
+
+    def update(self, paths):
+        "Index any new or changed files among `paths`, returning those (re)indexed."
+        return [p for p in paths if self.update_file(p)]
+
+    def update_tree(self, root, pattern="*.mmd", prune=True):
+        """
+        Index any new or changed files matching `pattern` under the directory `root`
+        (e.g. `ns_path`, for every namespace domain), and with `prune`, drop the
+        indexed files under `root` which no longer exist. Returns the files indexed.
+        """
+        root = Path(root).resolve()
+        paths = sorted(str(p) for p in root.rglob(pattern) if p.is_file())
+        if prune:
+            prefix = f"{root}{os.sep}"
+            gone = set(p for p in self.files if p.startswith(prefix)) - set(paths)
+            for path in gone:
+                self.remove(path)
+        return self.update(paths)
+
+    def remove(self, filepath):
+        "Drop the file at `filepath` from the index."
+        path = os.path.abspath(filepath)
+        self._discard(path)
+        self.entry_path(path).unlink(missing_ok=True)
+
+    def prune(self):
+        "Drop the indexed files which no longer exist."
+        for path in [p for p in self.files if not os.path.exists(p)]:
+            self.remove(path)
+
+    def clear(self):
+        for path in list(self.files):
+            self.remove(path)
+
+    def _candidates(self, terms):
+        if not terms:
+            return list(self.files.values())
+        postings = [self.files_by_term.get(t, set()) for t in terms]
+        paths = set.intersection(*postings)
+        return [self.files[p] for p in sorted(paths)]
+
+    def search(self, text=None, prefix=None, header=None):
+        """
+        Locations of the nodes containing every term (word) of `text`, with the given
+        `prefix` (matched by identity, so `Prefix.Answer` and `Prefix.InitList` are
+        told apart) and in the section of a header whose contents are `header`
+        (compared case-insensitively, as are the terms). Any of these may be omitted,
+        e.g. `search(prefix=Prefix.Question, header="Y")` for the questions under Y.
+        """
+        terms = terms_of(text) if text else []
+        prefix_code = None if prefix is None else prefix_codes[prefix._name_]
+        return [
+            file_index.location(i)
+            for file_index in self._candidates(terms)
+            for i in file_index.node_indices(terms, prefix_code, header)
+        ]
+
+    def files_mentioning(self, text):
+        "Paths of the files which contain every term of `text` (in any of its nodes)."
+        return sorted(f.path for f in self._candidates(terms_of(text)))
+
+    def lists(self, header=None):
+        """
+        Locations of the lists whose header node's contents are `header` (compared
+        case-insensitively), or of all lists if `header` is `None`.
+        """
+        return [l for f in self.files.values() for l in f.lists(header)]
+
+    def headers(self):
+        "Count of each (normalised) header text across the corpus."
+        counts = {}
+        for file_index in self.files.values():
+            for text in file_index.header_texts:
+                counts[text] = counts.get(text, 0) + 1
+        return counts
+
+    def prefixes(self):
+        "Count of the nodes with each prefix across the corpus (`None` if unprefixed)."
+        counts = {}
+        for file_index in self.files.values():
+            for code in set(file_index.prefixes):
+                prefix = prefix_by_code[code]
+                counts[prefix] = counts.get(prefix, 0) + file_index.prefixes.count(code)
+        return counts
+
+    def __len__(self):
+        return len(self.files)
+
+    def __repr__(self):
+        n_nodes = sum(len(f.prefixes) for f in self.files.values())
+        s = "s" if len(self) != 1 else ""
+        return f"Index of {n_nodes} nodes in {len(self)} file{s} at {self.index_dir}"
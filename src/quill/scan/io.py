@@ -1,9 +1,115 @@
-from .lever import MMD
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO, TextIOWrapper
 
-__all__ = ["mmd"]
+from .cache import ParseCache
+from .lever import MMD, NodeTable, parse_nodes_to_list
+from .lever.mapped import MappedText
+from .lever.parser import normalise_listparseconfig
+from .lever.structure import NodeBlock, iter_block_lines
+from .lever.tokens import Tokeniser
 
+__all__ = ["mmd", "mmd_many", "iter_mmd_blocks", "set_parse_cache"]
 
-def mmd(filepath, listparseconfig=None):
-    with open(filepath) as f:
-        mmd_lines = f.readlines()
+parse_cache = None  # opt-in default for `mmd`, see `set_parse_cache`
+
+
+def set_parse_cache(cache=True):
+    """
+    Opt in (or with `False`, out) to caching every `mmd` parse on disk by default.
+    Pass `True` for a `ParseCache` in the default cache directory, or pass your own.
+    """
+    global parse_cache
+    parse_cache = ParseCache() if cache is True else (cache or None)
+    return parse_cache
+
+
+def mmd(filepath, listparseconfig=None, columnar=False, mmap=False, cache=None):
+    """
+    Parse the MMD file at `filepath`. If `columnar` is `True`, return a `NodeTable`
+    (whose lists follow the `BlockList` rules, so `listparseconfig` is not used).
+    If `mmap` is `True`, memory-map the file rather than reading its lines, so that
+    node contents are only decoded from the mapped file upon access.
+
+    If `cache` is a `ParseCache` (or `True`, for one in the default directory), the
+    parsed document is loaded from the cache if the file and the parse options are
+    unchanged since it was stored, else parsed and stored. By default, the cache set
+    by `set_parse_cache` is used (if any), and passing `False` disables it.
+    """
+    if cache is None:
+        cache = parse_cache
+    elif cache is True:
+        cache = ParseCache()
+    if cache:
+        return _cached_mmd(filepath, listparseconfig, columnar, mmap, cache)
+    if mmap:
+        mmd_lines = MappedText(filepath)
+    else:
+        with open(filepath) as f:
+            mmd_lines = f.readlines()
+    if columnar:
+        return NodeTable(mmd_lines)
     return MMD(mmd_lines, listparseconfig=listparseconfig)
+
+
+def _cached_mmd(filepath, listparseconfig, columnar, mmap, cache):
+    with open(filepath, "rb") as f:
+        content = f.read()
+    options = (normalise_listparseconfig(listparseconfig), columnar, mmap)
+    key = cache.key(filepath, content, options)
+    loads = dumps = None  # pickled: a `NodeTable`, or nodes kept on the mapped file
+    if not (columnar or mmap):
+        loads = partial(MMD.from_bytes, listparseconfig=listparseconfig)
+        dumps = MMD.to_bytes
+    parsed = cache.get(key, loads)
+    if parsed is None:
+        if mmap:
+            mmd_lines = MappedText(filepath)
+        else:
+            # decode as `open` would in text mode (i.e. with universal newlines)
+            mmd_lines = TextIOWrapper(BytesIO(content)).readlines()
+        if columnar:
+            parsed = NodeTable(mmd_lines)
+        else:
+            parsed = MMD(mmd_lines, listparseconfig=listparseconfig)
+        cache.put(key, parsed, dumps)
+    return parsed
+
+
+def iter_mmd_blocks(filepath, listparseconfig=None, lever_config=None):
+    """
+    Generator function which reads the MMD file at `filepath` incrementally, yielding
+    each `NodeBlock` (fully tokenised) along with a list of the block-level lists
+    parsed from it, as `(block, lists)`, as soon as the blank line ending the block
+    is reached. Only one block's lines are held in memory at a time.
+    """
+    listparseconfig = normalise_listparseconfig(listparseconfig)
+    listclass = listparseconfig.get("listclass")
+    listconfig = listparseconfig.get("listconfig")
+    tokeniser = Tokeniser(lever_config)
+    with open(filepath) as f:
+        for block_no, (block_lines, line_no) in enumerate(iter_block_lines(f)):
+            block = NodeBlock(block_lines, line_no, block_no, tokeniser)
+            lists = list(parse_nodes_to_list(block.nodes, listconfig, listclass))
+            yield block, lists
+
+
+def mmd_many(
+    paths, listparseconfig=None, workers=None, columnar=False, chunksize=1, cache=None
+):
+    """
+    Parse many MMD files across a pool of `workers` processes (by default, one per
+    CPU), returning the parsed `MMD` objects (or `NodeTable` objects if `columnar`)
+    in the order of `paths`. The columnar form is the cheaper one to send back from
+    the workers, as its columns pickle as flat arrays. The `cache` is as for `mmd`.
+    """
+    paths = list(paths)
+    if cache is None:
+        cache = parse_cache  # pass the default to the workers explicitly
+    parse = partial(
+        mmd, listparseconfig=listparseconfig, columnar=columnar, cache=cache
+    )
+    if workers == 1 or len(paths) < 2:
+        return list(map(parse, paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse, paths, chunksize=chunksize))
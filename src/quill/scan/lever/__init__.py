@@ -1,4 +1,14 @@
 from .lists import parse_nodes_to_list
 from .mmd import MMD
+from .table import NodeTable
 
-__all__ = ["MMD", "parse_nodes_to_list"]
+__all__ = ["MMD", "NodeTable", "parse_nodes_to_list"]
+
+
+def __getattr__(name):
+    # `LineBatch` needs numpy, so is only imported upon use (not by tokenising)
+    if name == "LineBatch":
+        from .batch import LineBatch
+
+        return LineBatch
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
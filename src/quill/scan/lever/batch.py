@@ -0,0 +1,206 @@
+from ...__share__ import import_numpy
+from .structure import iter_block_lines
+from .tokens import (
+    Tokeniser,
+    prefix_by_code,
+    prefix_codes,
+    resolve_lever_config,
+    suffix_codes,
+)
+
+__all__ = ["LineBatch", "classify_lines"]
+
+np = import_numpy()  # (see the `batch` extra)
+
+HEAD = 10  # bytes needed to determine a line's prefix (see `Tokeniser`)
+
+codes = {name: np.uint8(code) for name, code in prefix_codes.items()}
+init_list_suffix_code = np.uint8(suffix_codes["InitList"])
+# Length of each prefix by its code (in bytes, equal to characters as it is ASCII)
+prefix_lengths = np.array([len(p.str) if p else 0 for p in prefix_by_code])
+
+
+class LineBatch:
+    """
+    The lines of many MMD files in one byte buffer, with arrays of the byte offsets
+    at which each line starts and ends (sans newline, dropping any `\\r` before it)
+    and of the index of the first line of each file, so that the lines of a whole
+    corpus can be classified at once (see `classify_lines`).
+    """
+
+    def __init__(self, buffer, starts, ends, file_starts, paths=None):
+        self.buffer = buffer
+        self.starts = starts
+        self.ends = ends
+        self.file_starts = file_starts
+        self.paths = paths
+
+    @classmethod
+    def from_bytes(cls, contents, paths=None):
+        "Batch the lines of each file's `contents` (a list of `bytes`)."
+        parts = []
+        for content in contents:
+            parts.append(content)
+            if content and not content.endswith(b"\n"):
+                parts.append(b"\n")  # so every line (including the last) ends at one
+        buffer = np.frombuffer(b"".join(parts), dtype=np.uint8)
+        ends = np.flatnonzero(buffer == 0x0A)
+        starts = np.empty_like(ends)
+        starts[:1] = 0
+        starts[1:] = ends[:-1] + 1
+        crlf = (ends > starts) & (buffer[ends - 1] == 0x0D)
+        ends -= crlf
+        file_sizes = [len(c) + (bool(c) and not c.endswith(b"\n")) for c in contents]
+        file_ends = np.cumsum(file_sizes)
+        file_starts = np.searchsorted(starts, file_ends - np.asarray(file_sizes))
+        return cls(buffer, starts, ends, file_starts, paths)
+
+    @classmethod
+    def from_files(cls, paths):
+        "Batch the lines of the files at `paths`."
+        paths = list(paths)
+        contents = []
+        for path in paths:
+            with open(path, "rb") as f:
+                contents.append(f.read())
+        return cls.from_bytes(contents, paths)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def n_files(self):
+        return len(self.file_starts)
+
+    def file_range(self, f):
+        "The range of the indexes of the lines of the file numbered `f`."
+        stop = self.file_starts[f + 1] if f + 1 < self.n_files else len(self)
+        return range(self.file_starts[f], stop)
+
+    def line(self, i):
+        return bytes(self.buffer[self.starts[i] : self.ends[i]]).decode()
+
+    def classify(self, lever_config=None):
+        "Classify every line (see `classify_lines`)."
+        return classify_lines(self, lever_config)
+
+    def __repr__(self):
+        s = "s" if self.n_files != 1 else ""
+        return f"Batch of {len(self)} lines from {self.n_files} file{s}"
+
+
+def classify_lines(batch, lever_config=None):
+    """
+    Tokenise the prefixes and suffixes of all lines of a `LineBatch`, giving the
+    same codes as `Tokeniser` (i.e. as `tokenise_line`) would for each line, from
+    vectorised comparisons of the first bytes of every line. Returns three arrays
+    over the lines: the prefix codes, the suffix codes, and whether each line is a
+    node (`False` for the blank lines which separate blocks, which are not).
+
+    The context-dependent cases are resolved from the preceding line in the block
+    (`-:` as an answer to a question or as a list initialised by a `:` suffix) and
+    the lists opened so far in each block (`-,:` list continuations). Any file with
+    a line the tokeniser would reject, or tokenised without `ALLOW_LIST_WITHOUT_
+    SUFFIX_INIT`, falls back to the Python tokeniser (to raise or report the same).
+    """
+    config = resolve_lever_config(lever_config)
+    n = len(batch)
+    starts, ends = batch.starts, batch.ends
+    lengths = ends - starts
+    # The first bytes of every line, zeroed beyond its end
+    padded = np.concatenate([batch.buffer, np.zeros(HEAD, dtype=np.uint8)])
+    cols = np.arange(HEAD)
+    head = padded[starts[:, None] + cols]
+    head[cols >= lengths[:, None]] = 0
+    c0, c1, c2 = head[:, 0], head[:, 1], head[:, 2]
+    dash = c0 == ord("-")
+    # Blocks: a blank line separates blocks unless its block is empty (so it is kept
+    # as a blank node), as for `iter_block_lines`, so within a run of blank lines the
+    # separators alternate (starting from the first, unless the run starts a file)
+    blank = lengths == 0
+    file_start = np.zeros(n, dtype=bool)
+    file_start[batch.file_starts[batch.file_starts < n]] = True
+    idx = np.arange(n)
+    prev_blank = np.zeros(n, dtype=bool)
+    prev_blank[1:] = blank[:-1]
+    run_start = blank & (file_start | ~prev_blank)
+    run_from = np.maximum.accumulate(np.where(run_start, idx, 0))
+    run_at_file_start = file_start[run_from]
+    sep = blank & (((idx - run_from) % 2 == 1) == run_at_file_start)
+    node = ~sep
+    # Context-free prefixes
+    prefixes = np.zeros(n, dtype=np.uint8)
+    prefixes[dash] = codes["PlainNode"]
+    prefixes[blank] = codes["BlankNode"]
+    lead = {k: dash & (c1 == ord(k)) for k in ":?,.#~"}
+    prefixes[lead["?"]] = codes["Question"]
+    comma = lead[","]
+    prefixes[comma] = codes["FollowOn"]
+    prefixes[comma & (c2 == ord(","))] = codes["Ascent"]
+    prefixes[comma & (c2 == ord("?"))] = codes["ContQuestion"]
+    stop = lead["."]
+    prefixes[stop] = 0
+    prefixes[stop & (c2 == ord("."))] = codes["Descent"]
+    prefixes[stop & (c2 == ord(","))] = codes["ContDesc"]
+    tilde = lead["~"] & np.all(head[:, :6] == np.frombuffer(b"-~==~-", np.uint8), 1)
+    prefixes[tilde] = codes["SectBreak"]
+    hashes = head[:, 2 : 2 + Tokeniser.max_header] == ord("#")
+    levels = 1 + np.cumprod(hashes, axis=1).sum(axis=1)
+    header = lead["#"]
+    for level in range(1, Tokeniser.max_header + 1):
+        prefixes[header & (levels == level)] = codes[f"Header{level}"]
+    # Context-dependent prefixes, from the directly preceding node in the block
+    has_prev = node & ~file_start
+    has_prev[1:] &= node[:-1]
+    has_prev[0] = False
+    prev = np.maximum(idx - 1, 0)
+    colon = lead[":"]
+    prefixes[colon & (c2 == ord("'"))] = codes["Because"]
+    prefixes[colon & (c2 == ord("."))] = codes["Therefore"]
+    pairable = colon & (c2 != ord("'")) & (c2 != ord("."))
+    answer = pairable & has_prev & (prefixes[prev] == codes["Question"])
+    prefixes[pairable] = codes["InitList"]
+    prefixes[answer] = codes["Answer"]
+    # A list is open from the first `InitList` in the block
+    block_first = node & ~has_prev
+    block_from = np.maximum.accumulate(np.where(block_first, idx, 0))
+    opened = np.cumsum(prefixes == codes["InitList"])
+    before_block = np.where(block_from > 0, opened[np.maximum(block_from - 1, 0)], 0)
+    opened_before = np.zeros(n, dtype=bool)
+    opened_before[1:] = (opened[:-1] - before_block[1:]) > 0
+    prefixes[comma & (c2 == ord(":")) & opened_before] = codes["ContList"]
+    # The preceding node's suffix marks a list if its contents end with a colon
+    prev_pre_len = np.zeros(n, dtype=np.int64)
+    prev_pre_len[1:] = prefix_lengths[prefixes[:-1]]
+    prev_colon_end = np.zeros(n, dtype=bool)
+    prev_colon_end[1:] = (lengths[:-1] > 0) & (
+        padded[np.maximum(ends[:-1] - 1, 0)] == ord(":")
+    )
+    prev_colon_end &= lengths[prev] > prev_pre_len
+    suffix_init = pairable & has_prev & ~answer & prev_colon_end
+    suffixes = np.zeros(n, dtype=np.uint8)
+    suffixes[idx[suffix_init] - 1] = init_list_suffix_code
+    prefixes[sep] = 0
+    # Lines the tokeniser rejects (or reports) are re-tokenised in Python
+    short = (lead[":"] | lead[","] | lead["."]) & (lengths < 3)
+    rejected = node & ((~dash & ~blank) | short | (header & (levels > 8)))
+    if not config["ALLOW_LIST_WITHOUT_SUFFIX_INIT"]:
+        rejected |= pairable
+    if rejected.any():
+        files = np.unique(np.searchsorted(batch.file_starts, idx[rejected], "right"))
+        for f in files - 1:
+            _retokenise_file(batch, f, config, prefixes, suffixes)
+    return prefixes, suffixes, node
+
+
+def _retokenise_file(batch, f, config, prefixes, suffixes):
+    "Tokenise the lines of the file numbered `f` in Python (so as to raise errors)."
+    lines_range = batch.file_range(f)
+    lines = [batch.line(i) for i in lines_range]
+    tokeniser = Tokeniser(config)
+    for block_no, (block_lines, line_no) in enumerate(iter_block_lines(lines)):
+        start_line = line_no - len(block_lines) + 1
+        for node in tokeniser.tokenise_block(block_lines, start_line, block_no):
+            i = lines_range.start + node.line_no - 1  # line numbers count from 1
+            prefixes[i] = node._pre
+            suffixes[i] = node._suf
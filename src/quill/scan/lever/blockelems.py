@@ -5,6 +5,7 @@ __all__ = ["BlockElem", "BlockList"]
 
 class BlockElem(BaseElem):
     "Base class for any block-level element."
+
     # def __init__(self, nodelist):
     #    super().__init__(nodelist)
 
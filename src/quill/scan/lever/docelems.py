@@ -1,6 +1,13 @@
-from .elems import BaseElem
+from array import array
+from bisect import bisect_left, bisect_right
 
-__all__ = ["DocElem", "DocLists"]
+from .elems import BaseElem, NodeRange
+from .tokens import prefix_codes
+
+__all__ = ["DocElem", "DocLists", "DocHeaderTree", "DocNodeIndex"]
+
+# Level of each header prefix, by its code
+header_levels = {prefix_codes[f"Header{level}"]: level for level in range(1, 9)}
 
 
 class DocElem(BaseElem):
@@ -22,10 +29,9 @@ class DocLists(DocElem, list):
     of blocks' lines' output from parsing the block nodes to
     lists (however there is no need to confine the lists to
     block-level features after they have been parsed as such).
+    The lists are views on their blocks' nodes, so no nodes are stored twice.
     """
 
-    # TODO: wasteful to store nodes twice: just store index for header/list items
-    # i.e. some 'view' on nodes, not a duplicate copy of the nodes
     def __init__(self, nodelists):
         super().__init__()
         self.extend(nodelists)
@@ -37,11 +43,174 @@ class DocLists(DocElem, list):
         return f"{n_lists} list{s}"
 
 
-# Example use case
 class DocHeaderTree(DocElem):
     """
-    A doc-level header tree could be a hierarchy of header nodes.
+    A doc-level header tree: the hierarchy of header nodes (`Prefix.Header1` to
+    `Header8`) in a document, indexed by line number. The headers are added in line
+    number order (in one pass over the document's nodes, upon first access of its
+    `headers`), recording each one's level, the index of its parent header and the
+    end of its subtree.
+
+    A header's section runs up to the next header of the same or a higher level,
+    so the sections enclosing a line, the next or previous header, and a header's
+    subtree are all found by bisecting the sorted line numbers.
     """
 
-    def __init__(self, nodelist):
-        super().__init__(nodelist)
+    def __init__(self, nodelist=None):
+        super().__init__()
+        self.nodes = []
+        self.line_nos = array("I")
+        self.levels = array("B")
+        self.parents = array("i")  # index of the parent header, or -1
+        self.ends = array("I")  # index after the last header in the subtree
+        self._open = []  # indexes of headers whose subtree is not yet closed
+        self.extend(nodelist or [])
+
+    def add(self, node):
+        "Add a header node (which must come after any already added)."
+        level = header_levels[node._pre]
+        i = len(self.nodes)
+        while self._open and self.levels[self._open[-1]] >= level:
+            self.ends[self._open.pop()] = i  # an equal or higher header closes it
+        self.nodes.append(node)
+        self.line_nos.append(node.line_no)
+        self.levels.append(level)
+        self.parents.append(self._open[-1] if self._open else -1)
+        self.ends.append(i + 1)
+        self._open.append(i)
+        for j in self._open:
+            self.ends[j] = i + 1
+
+    def extend(self, nodes):
+        "Add any header nodes among `nodes` (in line number order)."
+        for node in nodes:
+            if node._pre in header_levels:
+                self.add(node)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __getitem__(self, i):
+        return self.nodes[i]
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def index_of(self, node):
+        "Index of a header node in the tree."
+        i = bisect_left(self.line_nos, node.line_no)
+        if i == len(self) or self.nodes[i] is not node:
+            raise ValueError(f"{node!r} is not a header in the tree")
+        return i
+
+    def index_at(self, line_no):
+        "Index of the innermost header whose section contains `line_no` (else -1)."
+        return bisect_right(self.line_nos, line_no) - 1
+
+    def section_at(self, line_no):
+        "The innermost header whose section contains `line_no` (else `None`)."
+        i = self.index_at(line_no)
+        return self.nodes[i] if i >= 0 else None
+
+    def sections_at(self, line_no):
+        "The headers of all sections containing `line_no`, outermost first."
+        sections = []
+        i = self.index_at(line_no)
+        while i >= 0:
+            sections.append(self.nodes[i])
+            i = self.parents[i]
+        return sections[::-1]
+
+    def next_header(self, line_no):
+        "The first header after `line_no` (else `None`)."
+        i = bisect_right(self.line_nos, line_no)
+        return self.nodes[i] if i < len(self) else None
+
+    def prev_header(self, line_no):
+        "The last header before `line_no` (else `None`)."
+        i = bisect_left(self.line_nos, line_no) - 1
+        return self.nodes[i] if i >= 0 else None
+
+    def parent(self, i):
+        "The parent of the header at index `i` (else `None`)."
+        parent = self.parents[i]
+        return self.nodes[parent] if parent >= 0 else None
+
+    def children(self, i):
+        "The direct subheaders of the header at index `i`."
+        return [
+            self.nodes[j] for j in range(i + 1, self.ends[i]) if self.parents[j] == i
+        ]
+
+    def subtree(self, i):
+        "The header at index `i` and all of its subheaders (a view, in order)."
+        return NodeRange(self.nodes, i, self.ends[i])
+
+    def section_lines(self, i):
+        """
+        The line numbers spanned by the section of the header at index `i`, as
+        `(start, stop)` where `stop` is the line of the next header outside of its
+        subtree (or `None` if the section runs to the end of the document).
+        """
+        end = self.ends[i]
+        stop = self.line_nos[end] if end < len(self) else None
+        return self.line_nos[i], stop
+
+    def outline(self):
+        "List of `(level, node)` for each header, e.g. for a table of contents."
+        return list(zip(self.levels, self.nodes))
+
+    def __repr__(self):
+        s = "s" if len(self) != 1 else ""
+        return f"Header tree of {len(self)} header{s}"
+
+
+class DocNodeIndex:
+    """
+    Doc-level indexes on the nodes of a document, built in one pass over its nodes
+    upon first access of its `index`: a list of the nodes by line number (with `None`
+    at the lines separating blocks) and lists of the nodes by prefix code, so a node
+    can be fetched by its line number (or its pair by its `paired_to` line number)
+    and the nodes with a given prefix gathered without iterating over the blocks.
+    """
+
+    def __init__(self, nodes=None):
+        self.by_line = []
+        self.by_prefix = {}
+        self.extend(nodes or [])
+
+    def extend(self, nodes):
+        "Add nodes (in line number order, after any already added)."
+        by_line, by_prefix = self.by_line, self.by_prefix
+        for node in nodes:
+            if node.line_no > len(by_line):
+                by_line.extend([None] * (node.line_no - len(by_line)))
+            by_line.append(node)
+            by_prefix.setdefault(node._pre, []).append(node)
+
+    def node_at(self, line_no):
+        "The node on line `line_no` (or `None` if it is a block-separating line)."
+        if not 0 <= line_no < len(self.by_line):
+            raise IndexError(f"Line {line_no} is outside of the document")
+        return self.by_line[line_no]
+
+    def pair_of(self, node):
+        "The node paired to a node (e.g. the answer to a question), else `None`."
+        paired_to = getattr(node, "paired_to", None)
+        if paired_to is None:
+            return None
+        _, paired_line_no = paired_to
+        return self.by_line[paired_line_no]
+
+    def nodes_by_prefix(self, prefix):
+        """
+        List of the nodes with `prefix` (matched by identity, so `Prefix.Answer` and
+        `Prefix.InitList` are told apart), or with no prefix if `prefix` is `None`.
+        A copy, so the index is unaffected by any changes to it.
+        """
+        code = 0 if prefix is None else prefix_codes[prefix._name_]
+        return list(self.by_prefix.get(code, ()))
+
+    def __repr__(self):
+        n_nodes = sum(map(len, self.by_prefix.values()))
+        return f"Index of {n_nodes} nodes on {len(self.by_line)} lines"
@@ -1,3 +1,8 @@
+from collections.abc import Sequence
+
+__all__ = ["BaseElem", "NodeRange"]
+
+
 class BaseElem:
     "Base class for any element (both block-level and doc-level)."
 
@@ -6,3 +11,34 @@ class BaseElem:
             self.nodes = nodes
         elif nodelists:
             self.items = nodelists
+
+
+class NodeRange(Sequence):
+    """
+    A read-only view on the nodes from index `start` up to `stop` of an indexable
+    `source` of nodes (a list of `Node` objects or a `NodeTable`), rather than a
+    copy of them.
+    """
+
+    __slots__ = ("source", "start", "stop")
+
+    def __init__(self, source, start, stop):
+        self.source = source
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.source[j] for j in range(self.start, self.stop)[i]]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("NodeRange index out of range")
+        return self.source[self.start + i]
+
+    def __repr__(self):
+        return repr(list(self))
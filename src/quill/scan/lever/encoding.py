@@ -0,0 +1,131 @@
+import json
+import struct
+import sys
+from array import array
+
+from .structure import NodeBlock
+from .tokens import Node, Tokeniser
+
+__all__ = ["encode_doc", "decode_doc", "ENCODING_VERSION"]
+
+ENCODING_VERSION = 1
+MAGIC = b"QMMD"
+# magic, version, lever config length, block count, node count, string table length
+HEADER = struct.Struct("<4sHIIIQ")
+
+
+def _column_bytes(typecode, values):
+    "Little-endian bytes of an `array` column of `values`."
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(typecode, buffer, offset, count):
+    "Read a little-endian `array` column of `count` values at `offset` in `buffer`."
+    column = array(typecode)
+    end = offset + count * column.itemsize
+    column.frombytes(buffer[offset:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+
+def encode_doc(doc):
+    """
+    Encode the tokenised blocks of a `BlockDoc` (or `Doc`) as bytes: a header (with
+    the encoding version and the tokeniser config), then the node and block columns
+    as little-endian arrays (integer affix codes, line numbers, the index of each
+    paired node and the node count, start and end line of each block), then a single
+    UTF-8 string table of the nodes' contents (separated by newlines).
+
+    Only the tokenised state is encoded: lists are re-parsed from the nodes upon
+    access, and any other attributes set on the nodes are not kept.
+    """
+    nodes = [n for b in doc.blocks for n in b.nodes]
+    index_by_line = {n.line_no: i for i, n in enumerate(nodes)}
+    paired = []
+    for n in nodes:
+        if hasattr(n, "paired_to"):
+            _, paired_line_no = n.paired_to
+            paired.append(index_by_line[paired_line_no])
+        else:
+            paired.append(-1)
+    config = json.dumps(doc.tokeniser.config).encode()
+    strings = "\n".join(n.contents or "" for n in nodes).encode()
+    header = HEADER.pack(
+        MAGIC, ENCODING_VERSION, len(config), doc.n_blocks, len(nodes), len(strings)
+    )
+    return b"".join(
+        [
+            header,
+            config,
+            _column_bytes("B", [n._pre for n in nodes]),
+            _column_bytes("B", [n._suf for n in nodes]),
+            _column_bytes("I", [n.line_no for n in nodes]),
+            _column_bytes("i", paired),
+            _column_bytes("I", [len(b.nodes) for b in doc.blocks]),
+            _column_bytes("I", [b.start_line for b in doc.blocks]),
+            _column_bytes("I", [b.end_line for b in doc.blocks]),
+            strings,
+        ]
+    )
+
+
+def decode_doc(data, doc):
+    """
+    Decode bytes from `encode_doc` into `doc`, an uninitialised `BlockDoc` (or `Doc`)
+    instance, setting its tokeniser, blocks and node indexes. Raises a `ValueError`
+    if the bytes are not of the current encoding version.
+    """
+    data = memoryview(data)
+    if len(data) < HEADER.size:
+        raise ValueError("Too few bytes for an encoded document")
+    magic, version, n_config, n_blocks, n_nodes, n_strings = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded document (bad magic bytes)")
+    if version != ENCODING_VERSION:
+        raise ValueError(f"Encoding version {version} is not {ENCODING_VERSION}")
+    offset = HEADER.size
+    config = json.loads(bytes(data[offset : offset + n_config]))
+    offset += n_config
+    prefixes, offset = _read_column("B", data, offset, n_nodes)
+    suffixes, offset = _read_column("B", data, offset, n_nodes)
+    line_nos, offset = _read_column("I", data, offset, n_nodes)
+    paired, offset = _read_column("i", data, offset, n_nodes)
+    counts, offset = _read_column("I", data, offset, n_blocks)
+    start_lines, offset = _read_column("I", data, offset, n_blocks)
+    end_lines, offset = _read_column("I", data, offset, n_blocks)
+    strings = str(data[offset : offset + n_strings], "utf-8").split("\n")
+    doc.tokeniser = Tokeniser(config)
+    nodes = []
+    blocks = []
+    new_node = Node.__new__
+    start = 0
+    for block_no, count in enumerate(counts):
+        block = NodeBlock.__new__(NodeBlock)
+        block._digest = None
+        block.start_line = start_lines[block_no]
+        block.end_line = end_lines[block_no]
+        block.number = block_no
+        block._nodes = block_nodes = []
+        for i in range(start, start + count):
+            node = new_node(Node)
+            node._line = contents = strings[i]
+            node._start = 0
+            node._end = len(contents)
+            node._pre = prefixes[i]
+            node._suf = suffixes[i]
+            node.line_no = line_nos[i]
+            node.block_no = block_no
+            block_nodes.append(node)
+        start += count
+        nodes.extend(block_nodes)
+        blocks.append(block)
+    for i, j in enumerate(paired):
+        if j >= 0:
+            nodes[i].paired_to = (nodes[j].block_no, nodes[j].line_no)
+    doc.blocks = blocks
+    doc._headers = doc._index = None  # built upon first access
+    return doc
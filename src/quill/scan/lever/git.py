@@ -1,23 +1,158 @@
+import json
+import os
+from typing import NamedTuple
+
 from git import Repo
 
 from ...fold.ns_util import ns_path
+from ..cache import default_cache_dir
+
+__all__ = [
+    "RepoStatus",
+    "RepoStatusCache",
+    "repo_stamp",
+    "repo_statuses",
+    "stage_all",
+]
+
+default_status_path = default_cache_dir.parent / "git_status.json"
+
+
+class RepoStatus(NamedTuple):
+    """
+    Snapshot of a repo's git status: its active branch (`None` if detached), the SHA
+    of its HEAD commit (`None` if there are no commits), whether its working tree is
+    clean (including untracked files), and the `repo_stamp` it was taken at.
+    """
+
+    domain: str
+    branch: object
+    head: object
+    clean: bool
+    stamp: tuple
+
+
+def _mtime(path):
+    "The later of the mtime and ctime of `path` (in ns), or 0 if it doesn't exist."
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    return max(st.st_mtime_ns, st.st_ctime_ns)
+
+
+def _worktree_mtime(top):
+    """
+    The latest mtime or ctime (in ns) of any file or directory in the working tree
+    at `top` (skipping `.git`), along with the number of entries. The ctime is used
+    as well as the mtime, as an mtime may be set back (e.g. to the commit time).
+    """
+    latest, count = 0, 0
+    dirs = [top]
+    while dirs:
+        with os.scandir(dirs.pop()) as it:
+            for entry in it:
+                if entry.name == ".git":
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                latest = max(latest, st.st_mtime_ns, st.st_ctime_ns)
+                count += 1
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+    return latest, count
 
 
-def _has_clean_wt(domain, add_before_check=True):
+def repo_stamp(repo_dir):
     """
-    Helper function (TODO: move to a dedicated git module)
+    A stamp of the state of the repo at `repo_dir` which changes if its status may
+    have: the mtimes of `.git/HEAD`, `.git/index` and the ref HEAD points to (and of
+    `packed-refs`), and the latest mtime of (and number of entries in) the working
+    tree. Stats only, so much cheaper than computing the status itself.
     """
-    repo_dir = ns_path / domain
-    assert repo_dir.exists(), f"{repo_dir=!s} in namespace but doesn't exist"
-    repo = Repo(repo_dir)
-    if add_before_check:
-        repo.git.add("--all")
-    is_clean = not repo.is_dirty()
-    return is_clean
+    git_dir = repo_dir / ".git"
+    head = (git_dir / "HEAD").read_text().strip()
+    paths = [git_dir / "HEAD", git_dir / "index", git_dir / "packed-refs"]
+    if head.startswith("ref: "):
+        paths.append(git_dir / head.removeprefix("ref: "))
+    return (*map(_mtime, paths), *_worktree_mtime(repo_dir))
+
+
+class RepoStatusCache:
+    """
+    Persisted `RepoStatus` snapshots (stored as JSON at `path`), keyed by each repo's
+    directory. A snapshot is reused as long as its repo's `repo_stamp` is unchanged,
+    so repeated checks of the manifest's repos only recompute the status of the repos
+    which have changed since. Computing a status has no side effects (unlike staging
+    all changes with `git add --all` before checking whether the tree is dirty).
+    """
+
+    def __init__(self, path=None):
+        self.path = default_status_path if path is None else path
+        self._snapshots = None
+
+    @property
+    def snapshots(self):
+        if self._snapshots is None:
+            self._snapshots = {}
+            try:
+                stored = json.loads(self.path.read_text())
+            except (FileNotFoundError, ValueError):
+                stored = {}
+            for repo_dir, fields in stored.items():
+                domain, branch, head, clean, stamp = fields
+                self._snapshots[repo_dir] = RepoStatus(
+                    domain, branch, head, clean, tuple(stamp)
+                )
+        return self._snapshots
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.snapshots))
+        os.replace(tmp, self.path)
+
+    def get(self, domain, refresh=False, save=True):
+        """
+        The status of the repo of `domain`, from its snapshot if the repo's stamp is
+        unchanged (unless `refresh` is `True`), else recomputed and stored.
+        """
+        repo_dir = ns_path / domain
+        assert repo_dir.exists(), f"{repo_dir=!s} in namespace but doesn't exist"
+        stamp = repo_stamp(repo_dir)
+        snapshot = self.snapshots.get(str(repo_dir))
+        if not refresh and snapshot is not None and snapshot.stamp == stamp:
+            return snapshot
+        repo = Repo(repo_dir)
+        branch = None if repo.head.is_detached else repo.active_branch.name
+        head = repo.head.commit.hexsha if repo.head.is_valid() else None
+        clean = not repo.is_dirty(untracked_files=True)
+        snapshot = RepoStatus(domain, branch, head, clean, stamp)
+        self.snapshots[str(repo_dir)] = snapshot
+        if save:
+            self.save()
+        return snapshot
+
+    def get_many(self, domains, refresh=False):
+        "Dict of the status of the repo of each of the `domains` (saved once)."
+        before = dict(self.snapshots)
+        statuses = {d: self.get(d, refresh=refresh, save=False) for d in domains}
+        if self.snapshots != before:
+            self.save()
+        return statuses
+
+    def clear(self):
+        self._snapshots = {}
+        self.path.unlink(missing_ok=True)
+
+
+status_cache = RepoStatusCache()
+
+
+def repo_statuses(domains, refresh=False):
+    "Statuses of the repos of `domains` (see `RepoStatusCache`)."
+    return status_cache.get_many(domains, refresh=refresh)
 
 
-def _active_branch(domain):
-    "Return the string name of the active branch of the repo."
-    repo = Repo(ns_path / domain)
-    active_branch = repo.active_branch.name
-    return active_branch
+def stage_all(domain):
+    "Run `git add --all` in the repo of `domain` (explicitly, never implicitly)."
+    Repo(ns_path / domain).git.add("--all")
@@ -1,24 +1,39 @@
-from pandas import DataFrame
+from array import array
 
 from .blockelems import BlockList
-from .tokens import Prefix, Suffix
+from .elems import NodeRange
+from .tokens import Prefix, Suffix, prefix_by_code, prefix_codes, suffix_codes
 
-__all__ = ["parse_nodes_to_list", "SepBlockList"]
+__all__ = [
+    "parse_nodes_to_list",
+    "list_spans",
+    "SepBlockList",
+    "coerce_column",
+    "columns_to_df",
+    "sep_lists_df",
+    "iter_sep_list_rows",
+]
 
+# Prefix codes compared by value (so `Answer` opens a list just as `InitList` does)
+list_init_codes = frozenset(
+    i for i, p in enumerate(prefix_by_code) if p is not None and p == Prefix.InitList
+)
+cont_list_code = prefix_codes[Prefix.ContList._name_]
+init_list_suffix_code = suffix_codes[Suffix.InitList._name_]
 
-def create_BlockList(nodes, has_header, listclass=BlockList, config=None):
+
+def create_BlockList(nodes, header=None, listclass=BlockList, config=None):
     """
-    Simple wrapper to turn boolean `has_header` into a header `Node` argument
+    Simple wrapper to pass the list item `nodes` and `header` node (or `None`)
     to the `BlockList` class constructor (or any substituted `BlockList` class).
     """
-    header = nodes.pop(0) if has_header else None
     # for now only set up to handle `SepBlockList` config
-    listclasscheck = listclass is SepBlockList
     if config and listclass is SepBlockList:
         sep = config.get("sep") if "sep" in config else ":"
         hsep = config.get("headersep") if "headersep" in config else False
         lab = config.get("labels") if "labels" in config else None
-        return listclass(nodes, header, sep=sep, headersep=hsep, labels=lab)
+        dt = config.get("dtypes")
+        return listclass(nodes, header, sep=sep, headersep=hsep, labels=lab, dtypes=dt)
     else:
         return listclass(nodes, header)
 
@@ -28,47 +43,134 @@ def parse_nodes_to_list(nodes, listconfig=None, listclass=BlockList):
     Generator function which yields all lists per block, ignoring any intervening
     or pre/succeeding non-list nodes (except any directly preceding 'header' node,
     with a line-terminating colon marked as `Suffix.ListInit`).
+
+    The lists are found in a single pass over the nodes' prefix and suffix codes
+    (see `list_spans`), and hold views on index ranges of `nodes` (not copies).
+    """
+    prefixes = array("B", [n._pre for n in nodes])
+    suffixes = array("B", [n._suf for n in nodes])
+    for header, first, last in list_spans(prefixes, suffixes):
+        header_node = None if header is None else nodes[header]
+        items = NodeRange(nodes, first, last)
+        yield create_BlockList(items, header_node, listclass, listconfig)
+
+
+def list_spans(prefixes, suffixes, start=0, stop=None):
+    """
+    Generator function which follows the same rules as `parse_nodes_to_list` over
+    the prefix and suffix codes of a block's nodes (from index `start` up to `stop`),
+    yielding the index of the list header node (or `None`) along with the `first` and
+    `last` index of the range of list item nodes, as `(header, first, last)`.
     """
-    nodes = nodes.copy()  # do not modify input!
+    stop = len(prefixes) if stop is None else stop
     list_open = list_header_open = False
-    has_header = False
-    parsed = []  # nodes belonging to a list go here
-    while nodes:  # unlike a for loop, allows passing any remaining `nodes` upon return
-        node = nodes.pop(0)
+    header = first = None
+    for i in range(start, stop):
+        prefix = prefixes[i]
         if list_open:
             # very crudely, just terminate on any non-list continuation item
-            if node.prefix is Prefix.ContList:
-                parsed.append(node)
-            else:
+            if prefix != cont_list_code:
                 list_open = False  # list terminates
-                # a break here would skip any remaining nodes, requiring func recursion
-                # to capture multiple lists per block, a yield is the preferable option
-                yield create_BlockList(parsed, has_header, listclass, listconfig)
-                has_header = False  # reset this in case parsing another list in block
-                parsed = []
+                yield header, first, i
+                header = first = None  # reset in case parsing another list in block
         elif list_header_open:
-            if node.prefix == Prefix.InitList:
+            if prefix in list_init_codes:
                 list_header_open = False
                 list_open = True
-                parsed.append(node)
+                first = i
         else:
-            if node.suffix == Suffix.InitList:
-                list_header_open = has_header = True
-                parsed.append(node)
-            elif node.prefix == Prefix.InitList:
-                if list_header_open:
-                    list_header_open = False
+            if suffixes[i] == init_list_suffix_code:
+                list_header_open = True
+                header = i
+            elif prefix in list_init_codes:
                 list_open = True
-                parsed.append(node)
-    if parsed:
-        yield create_BlockList(parsed, has_header, listclass, listconfig)
+                first = i
+    if list_open:
+        yield header, first, stop
+    elif header is not None:
+        yield header, stop, stop  # the header of a list with no items
+
+
+def coerce_column(values, dtype=None):
+    """
+    Coerce a column of string `values` to a `dtype`: either `"int"`, `"date"` (parsed
+    to datetimes), `"category"`, or any other dtype accepted by pandas `astype`. With
+    no `dtype`, the strings are left as they are.
+    """
+    if dtype is None:
+        return values
+    from pandas import Series, to_datetime
+
+    column = Series(values, dtype=object)
+    if dtype == "int":
+        return column.astype("int64")
+    elif dtype == "date":
+        return to_datetime(column)
+    return column.astype(dtype)
+
+
+def columns_to_df(columns, labels, dtypes=None):
+    """
+    Build a DataFrame from per-column sequences of values, named by `labels` (any
+    columns beyond the labels are dropped), coercing any columns named in the dict
+    `dtypes` (see `coerce_column`).
+    """
+    from pandas import DataFrame
 
+    dtypes = dtypes or {}
+    datadict = {
+        label: coerce_column(list(values), dtypes.get(label))
+        for label, values in zip(labels, columns)
+    }
+    if not datadict:
+        return DataFrame(columns=list(labels))
+    return DataFrame(datadict)
 
-def _as_df(self, forbid_header=False):
-    labels = self._labels
-    nodes = self.all_nodes if self.has_sep_header and not forbid_header else self.nodes
-    datadict = {label: [getattr(node, label) for node in nodes] for label in labels}
-    return DataFrame.from_dict(datadict)
+
+def sep_lists_df(lists, header_labels=(), dtypes=None):
+    """
+    Build one DataFrame from the item rows of many `SepBlockList` lists, column by
+    column, with the header of each list repeated down its rows as the leading
+    columns named by `header_labels` (the header's separated values if the list
+    has a separated header, else the header's contents).
+    """
+    header_labels = list(header_labels)
+    labels = None
+    columns = None
+    for l in lists:
+        if labels is None:
+            labels = header_labels + list(l._labels)
+            columns = [[] for _ in labels]
+        n_rows = len(l.nodes)
+        header_values = l.header_parts if l.has_sep_header else [l.header.contents]
+        for column, value in zip(columns, header_values[: len(header_labels)]):
+            column.extend([value] * n_rows)
+        for column, values in zip(columns[len(header_labels) :], l.item_columns):
+            column.extend(values)
+    if labels is None:
+        from pandas import DataFrame
+
+        return DataFrame(columns=header_labels)
+    return columns_to_df(columns, labels, dtypes)
+
+
+def iter_sep_list_rows(lists, n_header=0):
+    """
+    Generator of the item rows of many `SepBlockList` lists as tuples, each led by
+    the first `n_header` values of its list's header (as for `sep_lists_df`, but
+    row by row and without building a DataFrame).
+    """
+    for l in lists:
+        header_values = l.header_parts if l.has_sep_header else [l.header.contents]
+        header_values = tuple(header_values[:n_header])
+        for row in zip(*l.item_columns):
+            yield header_values + row
+
+
+def _as_df(self, forbid_header=False, dtypes=None):
+    columns = self.item_columns if forbid_header else self.columns
+    dtypes = self.dtypes if dtypes is None else dtypes
+    return columns_to_df(columns, self._labels, dtypes)
 
 
 class SepBlockList(BlockList):
@@ -81,50 +183,75 @@ class SepBlockList(BlockList):
     header exists but does not conform to the CSV format, `sep_header`
     can disable the attempt to validate the header node in this way).
 
-    `tokenise_separated_values` implements an interface for setting
-    attributes on the `SepBlockList` according to a given list of
-    attribute names (TODO: method to create a dictionary from the list
-    nodes, to then e.g. create a `pandas.DataFrame`).
+    `tokenise_separated_values` splits all of the rows (the header, if
+    it is separated, and the items) in one pass into per-column lists
+    (`columns`), from which the `as_df` method builds a DataFrame (with
+    any `dtypes` coercion of its columns, see `coerce_column`).
     """
 
-    def __init__(self, nodes, h=None, par=None, sep=":", headersep=False, labels=None):
+    def __init__(
+        self,
+        nodes,
+        h=None,
+        par=None,
+        sep=":",
+        headersep=False,
+        labels=None,
+        dtypes=None,
+    ):
         super().__init__(nodes, header=h, parent_elem=par)
         self.sep = sep
         self.has_sep_header = headersep
-        self.tokenise_separated_values(labels)  # sets `parts` attribute
+        self.tokenise_separated_values(labels)  # sets `columns` attribute
         self._labels = labels
-        if labels:
-            self.as_df = _as_df.__get__(self)
+        self.dtypes = dtypes
+
+    @property
+    def as_df(self):
+        "Only available if labels were given (to name the DataFrame columns)."
+        if not self._labels:
+            raise AttributeError("Cannot make a DataFrame from an unlabelled list")
+        return _as_df.__get__(self)
+
+    @property
+    def parts(self):
+        "The separated values of each row (the header, if separated, then the items)."
+        return list(zip(*self.columns))
+
+    @property
+    def header_parts(self):
+        "The separated values of the header (if it is separated, else `None`)."
+        return [column[0] for column in self.columns] if self.has_sep_header else None
+
+    @property
+    def item_columns(self):
+        "The per-column values of the list items alone (i.e. excluding any header)."
+        if self.has_sep_header:
+            return [column[1:] for column in self.columns]
+        return self.columns
 
     def tokenise_separated_values(self, sep_header_labels=None):
-        n_parts = None
         if (
             self.has_sep_header
         ):  # there should be a header, to be parsed for sep. values
             assert self.header, "Cannot parse header: list is unheadered"
-            header_offset = 0
+            rows = [self.header, *self.nodes]
             if sep_header_labels:
                 n_labels = len(sep_header_labels)
                 labsetcount = len(set(sep_header_labels))
                 labsetcheck = labsetcount == labsetcount
                 assert labsetcheck, f"{n_labels} labels =/= {labsetcount} values"
-                assert "parts" not in sep_header_labels, "'parts' is a reserved label"
-        elif self.header:  # there is a header but not parsing for sep. values
-            header_offset = 1
-        else:  # there is no header so nothing to skip
-            header_offset = 0
-        for node in self.all_nodes[header_offset:]:
-            parts = node.contents.split(self.sep)
-            if n_parts:  # if sep. values count per node already set on first seen node
+        else:  # any header is not parsed for sep. values, so skip it
+            rows = self.nodes
+        split_rows = [node.contents.split(self.sep) for node in rows]
+        if split_rows:
+            n_parts = len(split_rows[0])
+            for node, parts in zip(rows, split_rows):
                 lencheck = len(parts) == n_parts
                 assert lencheck, f"{node} has {len(parts)} parts (expected {n_parts})"
-            else:
-                n_parts = len(parts)
-                if sep_header_labels:
-                    n_labels = len(sep_header_labels)
-                    labcountcheck = n_labels == n_parts
-                    assert labcountcheck, f"{n_labels} labels =/= {n_parts} values"
             if sep_header_labels:
-                for label, val in zip(sep_header_labels, parts):
-                    setattr(node, label, val)
-            setattr(node, "parts", parts)
+                n_labels = len(sep_header_labels)
+                labcountcheck = n_labels == n_parts
+                assert labcountcheck, f"{n_labels} labels =/= {n_parts} values"
+        # transpose the rows into columns in a single pass
+        self.columns = [list(column) for column in zip(*split_rows)]
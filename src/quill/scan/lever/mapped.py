@@ -0,0 +1,87 @@
+from mmap import ACCESS_READ, mmap
+
+__all__ = ["MappedText", "iter_block_spans"]
+
+
+class MappedText:
+    """
+    Read-only text of a memory-mapped file, indexed by byte offset. Slicing decodes
+    only the bytes sliced, so `Node` contents can be kept as offsets into the mapped
+    file (and decoded upon access) rather than as copies of its lines.
+
+    Lines are split on `\\n` (a trailing `\\r` is dropped, as for universal newlines).
+    """
+
+    head_len = 10  # bytes needed to determine a line's prefix (see `Tokeniser`)
+
+    def __init__(self, filepath, encoding="utf-8"):
+        self.filepath = filepath
+        self.encoding = encoding
+        with open(filepath, "rb") as f:
+            size = f.seek(0, 2)
+            # a zero-length file cannot be mapped
+            self.buffer = mmap(f.fileno(), 0, access=ACCESS_READ) if size else b""
+
+    def __reduce__(self):
+        # Pickle by path, so an unpickled copy maps the file afresh (without copying)
+        return (type(self), (self.filepath, self.encoding))
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError("MappedText can only be sliced (by byte offsets)")
+        return self.buffer[key].decode(self.encoding)
+
+    def head(self, start, end):
+        "Decode the start of the line from `start` to `end` (enough to tokenise it)."
+        return self.buffer[start : min(end, start + self.head_len)].decode(
+            self.encoding, errors="replace"
+        )
+
+    def startswith(self, s, start, end):
+        "As for `str.startswith`, but comparing the encoded bytes of `s` in place."
+        b = s.encode(self.encoding)
+        return end - start >= len(b) and self.buffer[start : start + len(b)] == b
+
+    def endswith(self, s, start, end):
+        "As for `str.endswith`, but comparing the encoded bytes of `s` in place."
+        b = s.encode(self.encoding)
+        return end - start >= len(b) and self.buffer[end - len(b) : end] == b
+
+    def iter_line_spans(self):
+        "Generator of the `(start, end)` byte offsets of each line (sans newline)."
+        buffer, size = self.buffer, len(self.buffer)
+        start = 0
+        while start < size:
+            newline = buffer.find(b"\n", start)
+            stop = size if newline == -1 else newline
+            end = stop - 1 if stop > start and buffer[stop - 1] == 0x0D else stop
+            yield start, end
+            start = stop + 1
+
+    def close(self):
+        if self.buffer:
+            self.buffer.close()
+
+    def __repr__(self):
+        return f"MappedText of {len(self)} bytes ({self.filepath})"
+
+
+def iter_block_spans(text):
+    """
+    Generator function which splits the lines of a `MappedText` into blocks by the
+    same rules as `iter_block_lines`, yielding each block's list of `(start, end)`
+    line spans along with the line number at which the block ends.
+    """
+    current_span_block = []
+    line_no = -1
+    for line_no, (start, end) in enumerate(text.iter_line_spans()):
+        if start == end and current_span_block:
+            yield current_span_block, line_no
+            current_span_block = []
+        else:
+            current_span_block.append((start, end))
+    if current_span_block:
+        yield current_span_block, line_no + 1
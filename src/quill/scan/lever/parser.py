@@ -1,59 +1,122 @@
-from pandas import DataFrame
-
 from ...fold.ns_util import ns
-from ...manifest.parsing import read_man, read_man_df
+from ...manifest.parsing import read_man, read_man_df, read_man_table
 from .blockelems import *  # temporary
 from .docelems import DocLists
-from .git import _active_branch, _has_clean_wt
-from .lists import BlockList, SepBlockList, parse_nodes_to_list
+from .encoding import decode_doc, encode_doc
+from .git import repo_statuses, stage_all
+from .lists import BlockList, SepBlockList, columns_to_df, parse_nodes_to_list
 from .structure import BlockDoc
 
-__all__ = ["Doc"]
+__all__ = ["Doc", "normalise_listparseconfig"]
+
+
+def normalise_listparseconfig(listparseconfig=None):
+    """
+    Fill in the list class in (a copy of) the `listparseconfig` dict passed to `Doc`,
+    so it can be expanded out as named arguments to `Doc._parse_lists`.
+    """
+    if listparseconfig is None:
+        return {"listclass": BlockList}
+    listparseconfig = listparseconfig.copy()  # do not modify input!
+    if listparseconfig.get("listclass") == "auto":
+        listparseconfig.update({"listclass": BlockList})
+    elif "sep" in listparseconfig and "listclass" not in listparseconfig:
+        # helper: do not require passing the list class itself, assume it from `sep`
+        sep_listconfig_keys = ["sep", "headersep", "labels", "dtypes"]
+        cfg = {k: v for (k, v) in listparseconfig.items() if k in sep_listconfig_keys}
+        for k in sep_listconfig_keys:
+            if k in listparseconfig:
+                del listparseconfig[k]
+        listparseconfig.update({"listclass": SepBlockList, "listconfig": cfg})
+    return listparseconfig
 
 
 class PartsList(list):
     """
     Simple list class which provides a pandas DataFrame method which will be
-    bound to the `Doc` instance (via a descriptor).
+    bound to the `Doc` instance (via a descriptor). If the `columns` of the parts
+    are given, the DataFrame is built from them rather than transposing the parts.
     """
 
-    def __init__(self, parts, part_keys=None):
+    def __init__(self, parts, part_keys=None, columns=None):
         self.extend(parts)
         self.part_keys = part_keys
+        self.columns = columns
 
     def as_df(self):
-        datadict = {k: [n[i] for n in self] for (i, k) in enumerate(self.part_keys)}
-        return DataFrame.from_dict(datadict)
+        columns = zip(*self) if self.columns is None else self.columns
+        return columns_to_df(columns, self.part_keys)
 
 
 class Doc(BlockDoc):
-    def __init__(self, lines, listparseconfig=None):
-        super().__init__(lines)  # block tokenisation pass, creating nodes property
-        if listparseconfig is None:
-            listparseconfig = {"listclass": BlockList}
-        elif listparseconfig.get("listclass") == "auto":
-            listparseconfig.update({"listclass": BlockList})
-        elif "sep" in listparseconfig and "listclass" not in listparseconfig:
-            # helper: do not require passing the list class itself, assume it from `sep`
-            sep_listconfig_keys = ["sep", "headersep", "labels"]
-            cfg = {
-                k: v for (k, v) in listparseconfig.items() if k in sep_listconfig_keys
-            }
-            for k in sep_listconfig_keys:
-                if k in listparseconfig:
-                    del listparseconfig[k]
-            listparseconfig.update({"listclass": SepBlockList, "listconfig": cfg})
-        self._parse(listparseconfig)  # tokenised block parsing, creating lists property
-        if hasattr(self, "all_parts") and self.all_parts.part_keys:
-            self.as_df = self.all_parts.as_df
-        if self.list:
-            self.repos = property(read_man).__get__(self)
-            self.repos_df = property(read_man_df).__get__(self)
+    """
+    Document of tokenised blocks, whose lists are parsed (according to the
+    `listparseconfig`) upon first access of `lists` or of any attribute derived from
+    them (`list`, `all_parts`, `as_df`, `repos`, `repo_table` and `repos_df`), so
+    that a document only iterated block by block never constructs its lists.
+    """
+
+    _list_attrs = ("all_parts", "as_df")  # set by `_parse` (if applicable)
+    _list_props = {  # if a single list
+        "repos": read_man,
+        "repo_table": read_man_table,
+        "repos_df": read_man_df,
+    }
+
+    def __init__(self, lines, listparseconfig=None, lever_config=None):
+        super().__init__(lines, lever_config)  # block tokenisation pass, creating nodes
+        self._listparseconfig = listparseconfig  # normalised upon parsing
+        self._lists = None  # tokenised block parsing, creating lists (upon access)
+
+    def __getattr__(self, name):
+        "Parse the lists upon first access of an attribute derived from them."
+        if "_lists" in self.__dict__:  # i.e. not mid-unpickling
+            if name in self._list_attrs and self._lists is None:
+                self._parse(self._listparseconfig)
+                return getattr(self, name)
+            elif name in self._list_props and self.list:
+                value = self._list_props[name](self)
+                setattr(self, name, value)  # cache (so it can be modified in place)
+                return value
+        raise AttributeError(
+            f"{type(self).__name__!r} object has no attribute {name!r}"
+        )
+
+    def to_bytes(self):
+        "Encode the tokenised document as bytes (see `encode_doc`)."
+        return encode_doc(self)
+
+    @classmethod
+    def from_bytes(cls, data, listparseconfig=None):
+        """
+        Decode a document from the bytes given by `to_bytes`, whose lists are then
+        parsed (according to the `listparseconfig`) upon access, as when initialised.
+        """
+        doc = decode_doc(data, cls.__new__(cls))
+        doc._listparseconfig = listparseconfig
+        doc._lists = None
+        return doc
 
     def _parse(self, listparseconfig=None):
         "May add other configs later, but for now just wrap the lists method."
+        listparseconfig = normalise_listparseconfig(listparseconfig)
         # populate the `lists` property by parsing all blocks' nodes
         self._parse_lists(**listparseconfig)  # expand out dict as named arguments
+        if hasattr(self, "all_parts") and self.all_parts.part_keys:
+            self.as_df = self.all_parts.as_df
+
+    def update(self, new_lines):
+        """
+        Update the document to the new lines, re-tokenising only the blocks which
+        changed (see `BlockDoc.update`). The lists are re-parsed upon next access,
+        re-parsing only the changed blocks' lists.
+        Returns the numbers of the blocks which were re-tokenised.
+        """
+        tokenised = super().update(new_lines)
+        self._lists = None
+        for name in (*self._list_attrs, *self._list_props):
+            self.__dict__.pop(name, None)
+        return tokenised
 
     def _parse_lists(
         self, listclass=None, part_keys=None, listconfig=None, strict_list_breaks=True
@@ -65,26 +128,34 @@ class Doc(BlockDoc):
         """
         # TODO strict_list_breaks param
         all_blocklists = []
+        parsed_blocks = getattr(self, "_block_lists", {})  # reused blocks' lists
+        options = (listclass, listconfig, strict_list_breaks)
+        if getattr(self, "_block_lists_options", None) != options:
+            parsed_blocks = {}  # parsed with other options, so stale
+        self._block_lists = {}
+        self._block_lists_options = options
         for block in self.blocks:
-            nodes = block.nodes
-            # yields blocklist objects
-            bl_generator = parse_nodes_to_list(nodes, listconfig, listclass)
-            blocklists = list(bl_generator)  # exhaust generator
+            if block in parsed_blocks:
+                blocklists = parsed_blocks[block]
+            else:
+                # yields blocklist objects
+                bl_generator = parse_nodes_to_list(block.nodes, listconfig, listclass)
+                blocklists = list(bl_generator)  # exhaust generator
+            self._block_lists[block] = blocklists
             all_blocklists.extend(blocklists)  # flat list: all BlockList objects in Doc
         # `DocLists` object from list of BlockList objects
         self.lists = DocLists(all_blocklists)
         if listclass is SepBlockList:
             pk = part_keys
             # N.B. maybe use an Enum rather than have to pass actual class?
-            self.all_parts = PartsList(
-                [
-                    n.parts
-                    for l in self.lists
-                    for n in (l.all_nodes if l.has_sep_header else l.nodes)
-                ],
-                part_keys=pk,
-            )
-        # TODO: wasteful to store nodes twice: just store index for header/list items
+            columns = []  # concatenated over the lists (in one pass per column)
+            for l in self.lists:
+                if not columns:
+                    columns = [[] for _ in l.columns]
+                for column, values in zip(columns, l.columns):
+                    column.extend(values)
+            parts = [list(row) for row in zip(*columns)]  # a list per node, as before
+            self.all_parts = PartsList(parts, part_keys=pk, columns=columns)
 
     @property
     def lists(self):
@@ -92,6 +163,8 @@ class Doc(BlockDoc):
         # of each's block's lines' output from parse_nodes_to_list
         # which will probably necessitate a more complicated structure,
         # in some dedicated class which manages lists by block
+        if self._lists is None:
+            self._parse(self._listparseconfig)
         return self._lists
 
     @property
@@ -117,12 +190,21 @@ class Doc(BlockDoc):
     def __repr__(self):
         return self._doc_repr
 
-    def check_manifest(self, add_before_check=True):
-        domains = self.repos_df.domain
-        self.repos_df["branch"] = [_active_branch(d) for d in domains]
-        self.repos_df["local"] = [domain in ns for domain in domains]
-        self.repos_df["clean"] = [
-            _has_clean_wt(d, add_before_check=add_before_check)
-            for d in domains
-            if d in ns
-        ]
+    def check_manifest(self, refresh=False, add_before_check=False):
+        """
+        Record the git status of each local repo in the manifest as `repo_status` (a
+        dict of `RepoStatus` by domain, which is also returned). Snapshots of the
+        statuses are reused for repos unchanged since (unless `refresh` is `True`).
+        Only if `add_before_check` is `True` are all changes staged beforehand.
+
+        The statuses are only put in a DataFrame (the `branch`, `local` and `clean`
+        columns of `repos_df`, `None` for repos which are not local) upon access of
+        `repos_df`, which is rebuilt after each check.
+        """
+        local = [d for d in self.repo_table.column("domain") if d in ns]
+        if add_before_check:
+            for d in local:
+                stage_all(d)
+        self.repo_status = repo_statuses(local, refresh=refresh)
+        self.__dict__.pop("repos_df", None)  # re-derived from the statuses on access
+        return self.repo_status
@@ -1,32 +1,123 @@
-from .tokens import Prefix, Suffix, tokenise_line
+from hashlib import blake2b
 
-__all__ = ["BlockDoc", "NodeBlock"]
+from .docelems import DocHeaderTree, DocNodeIndex
+from .mapped import MappedText, iter_block_spans
+from .tokens import Prefix, Suffix, Tokeniser
+
+__all__ = ["BlockDoc", "NodeBlock", "iter_block_lines", "block_digest"]
+
+
+def block_digest(block_lines):
+    "Content hash of a block's (newline-stripped) lines."
+    return blake2b("\n".join(block_lines).encode(), digest_size=16).digest()
+
+
+def iter_block_lines(doc_lines):
+    """
+    Generator function which splits (an iterable of) document lines into blocks at
+    blank lines, stripping newlines as it goes, and yields each block's lines along
+    with the line number at which the block ends. A blank line directly following
+    another blank line is kept in the next block (as a `Prefix.BlankNode`).
+    """
+    current_line_block = []
+    line_no = -1
+    for line_no, l in enumerate(doc_lines):
+        l = l.rstrip("\n")
+        if l == "" and current_line_block:
+            yield current_line_block, line_no
+            current_line_block = []
+        else:
+            current_line_block.append(l)
+    if current_line_block:
+        yield current_line_block, line_no + 1
 
 
 class BlockDoc:
     """
     Document formed by a list of one or more `NodeBlock` elements,
-    created upon reading file lines (newlines will be stripped).
+    created upon reading file lines (newlines will be stripped), or
+    from a `MappedText` (so nodes keep offsets into the mapped file).
+    Optionally specify `lever_config` dict to override the tokeniser
+    defaults from `lever_config_dict`. The header nodes are indexed in
+    `headers` (a `DocHeaderTree`), and all nodes by line number and prefix in
+    `index` (a `DocNodeIndex`), each built upon first access.
     """
 
-    def __init__(self, lines):
+    _headers = None  # built upon first access of `headers`
+    _index = None  # built upon first access of `index`
+
+    def __init__(self, lines, lever_config=None):
+        self.tokeniser = Tokeniser(lever_config)  # config resolved once per doc
         self._initblocks(lines)
 
-    def _add_nodeblock(self, lines, line_no, block_no):
-        self.blocks.append(NodeBlock(lines, line_no, block_no))
+    def _add_nodeblock(self, lines, line_no, block_no, source=None):
+        block = NodeBlock(lines, line_no, block_no, self.tokeniser, source=source)
+        self.blocks.append(block)
 
     def _initblocks(self, doc_lines):
-        doc_lines = [l.rstrip("\n") for l in doc_lines]
         self.blocks = []
-        current_line_block = []
-        for line_no, l in enumerate(doc_lines):
-            if l == "" and current_line_block:
-                self._add_nodeblock(current_line_block, line_no, self.n_blocks)
-                current_line_block = []
+        self._headers = None
+        self._index = None
+        if isinstance(doc_lines, MappedText):
+            for block_spans, line_no in iter_block_spans(doc_lines):
+                self._add_nodeblock(block_spans, line_no, self.n_blocks, doc_lines)
+            return
+        for block_lines, line_no in iter_block_lines(doc_lines):
+            self._add_nodeblock(block_lines, line_no, self.n_blocks)
+
+    def update(self, new_lines):
+        """
+        Update the document to the new lines, diffing it block by block: any blocks
+        whose content hash matches an existing block reuse that block's nodes (which
+        are just renumbered), and only the rest are tokenised. Returns the numbers of
+        the blocks which were tokenised.
+        """
+        reusable = {}
+        for block in reversed(self.blocks):
+            reusable.setdefault(block.digest, []).append(block)
+        blocks = []
+        tokenised = []
+        for block_lines, line_no in iter_block_lines(new_lines):
+            digest = block_digest(block_lines)
+            block_no = len(blocks)
+            if reusable.get(digest):
+                block = reusable[digest].pop()  # reuse identical blocks in order
+                block.renumber(line_no - len(block_lines) + 1, block_no)
             else:
-                current_line_block.append(l)
-        if current_line_block:
-            self._add_nodeblock(current_line_block, line_no + 1, self.n_blocks)
+                block = NodeBlock(block_lines, line_no, block_no, self.tokeniser)
+                block._digest = digest
+                tokenised.append(block_no)
+            blocks.append(block)
+        self.blocks = blocks
+        self._headers = None
+        self._index = None
+        return tokenised
+
+    @property
+    def headers(self):
+        "The `DocHeaderTree` of the header nodes (built upon first access, and cached)."
+        if self._headers is None:
+            self._headers = DocHeaderTree(n for b in self.blocks for n in b.nodes)
+        return self._headers
+
+    @property
+    def index(self):
+        "The `DocNodeIndex` of the nodes (built upon first access, and cached)."
+        if self._index is None:
+            self._index = DocNodeIndex(n for b in self.blocks for n in b.nodes)
+        return self._index
+
+    def node_at(self, line_no):
+        "The node on line `line_no` (or `None` if it is a block-separating line)."
+        return self.index.node_at(line_no)
+
+    def pair_of(self, node):
+        "The node paired to `node` (i.e. a question's answer or vice versa), else `None`."
+        return self.index.pair_of(node)
+
+    def nodes_by_prefix(self, prefix):
+        "The nodes with the given `prefix` (a `Prefix`, or `None` for no prefix)."
+        return self.index.nodes_by_prefix(prefix)
 
     @property
     def blocks(self):
@@ -46,17 +137,40 @@ class BlockDoc:
 
 
 class NodeBlock:
-    def __init__(self, block_lines, line_no, block_no):
+    def __init__(self, block_lines, line_no, block_no, tokeniser=None, source=None):
         self._nodes = []  # private property
+        self._digest = None  # computed upon access
         self.start_line = line_no - len(block_lines) + 1
         self.end_line = line_no
         self.number = block_no
-        self.tokenise_lines(block_lines)
+        self.tokenise_lines(block_lines, tokeniser, source)
 
     @property
     def nodes(self):
         return self._nodes
 
+    @property
+    def digest(self):
+        "Content hash of the block's lines (reconstituted from its nodes)."
+        if self._digest is None:
+            self._digest = block_digest([repr(n) for n in self.nodes])
+        return self._digest
+
+    def renumber(self, start_line, block_no):
+        "Move the block (and its nodes' line numbers) to `start_line` as `block_no`."
+        shift = start_line - self.start_line
+        if shift == 0 and block_no == self.number:
+            return
+        for node in self.nodes:
+            node.line_no += shift
+            node.block_no = block_no
+            if hasattr(node, "paired_to"):
+                _, paired_line_no = node.paired_to
+                node.paired_to = (block_no, paired_line_no + shift)
+        self.start_line += shift
+        self.end_line += shift
+        self.number = block_no
+
     def add_node(self, node):
         self._nodes.append(node)
 
@@ -70,15 +184,18 @@ class NodeBlock:
             f"nodes (L{self.start_line}-L{self.end_line})"
         )
 
-    def tokenise_lines(self, block_lines):
-        "Populate nodes property"
-        if block_lines[0].endswith("\n"):
+    def tokenise_lines(self, block_lines, tokeniser=None, source=None):
+        """
+        Populate nodes property (if a `MappedText` is passed as `source`, the
+        `block_lines` are the spans of the lines within it).
+        """
+        if source is None and block_lines[0].endswith("\n"):
             raise ValueError("Strip off newlines before passing into `NodeBlock`!")
-        tokenised = []
-        for i, l in enumerate(block_lines):
-            line_no = self.start_line + i
-            n = tokenise_line(l, line_no, self.number, seen=tokenised)
-            tokenised.append(n)
+        if tokeniser is None:
+            tokeniser = Tokeniser()
+        tokenised = tokeniser.tokenise_block(
+            block_lines, self.start_line, self.number, source
+        )
         # Since preceding lines' nodes are modified in the processing
         # of subsequent lines, only add nodes to block after finishing.
         for node in tokenised:
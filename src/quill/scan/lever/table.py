@@ -0,0 +1,297 @@
+from array import array
+
+from ...__share__ import import_numpy
+from .elems import NodeRange
+from .lists import list_spans
+from .mapped import MappedText, iter_block_spans
+from .structure import iter_block_lines
+from .tokens import (
+    Tokeniser,
+    prefix_by_code,
+    prefix_codes,
+    suffix_by_code,
+    suffix_codes,
+)
+
+__all__ = ["NodeTable", "TableNode", "TableBlock", "TableList"]
+
+
+class NodeTable:
+    """
+    Columnar alternative to the `Doc` of `NodeBlock` elements: tokenises the lines
+    of a document one block at a time (so only one block's `Node` objects exist at
+    once), storing each node's prefix and suffix codes, line and block numbers and
+    the index of any paired node as `array` columns over a single shared text buffer
+    of the document's (non-separating) lines. If `lines` is a `MappedText`, the
+    mapped file itself is the text buffer, so the lines are never copied.
+
+    Blocks, lists and nodes are then lightweight views (`TableBlock`, `TableList`
+    and `TableNode`) onto the columns, so a document can be filtered and counted
+    without materialising an object per line. Lists are located by the same rules
+    as `parse_nodes_to_list` (i.e. as for the `BlockList` list class).
+    """
+
+    def __init__(self, lines, lever_config=None):
+        self.tokeniser = Tokeniser(lever_config)
+        self.prefixes = array("B")
+        self.suffixes = array("B")
+        self.line_nos = array("I")
+        self.block_nos = array("I")
+        self.paired = array("i")  # index of the paired node, or -1 if unpaired
+        self.line_starts = array("Q")  # offsets of each node's line in the text buffer
+        self.line_ends = array("Q")
+        self.block_starts = array("I")  # index of each block's first node
+        self.list_headers = array("i")  # index of each list's header, or -1
+        self.list_starts = array("I")
+        self.list_stops = array("I")
+        self._initblocks(lines)
+
+    def _initblocks(self, doc_lines):
+        "Split the lines into blocks as for `BlockDoc`, adding each to the table."
+        if isinstance(doc_lines, MappedText):
+            self.text = doc_lines
+            for block_spans, line_no in iter_block_spans(doc_lines):
+                self._add_block(block_spans, line_no, doc_lines)
+            return
+        text_parts = []
+        text_len = 0
+        for block_lines, line_no in iter_block_lines(doc_lines):
+            block_spans = []
+            for line in block_lines:
+                text_parts.append(f"{line}\n")
+                block_spans.append((text_len, text_len + len(line)))
+                text_len += len(line) + 1
+            self._add_block(block_spans, line_no, block_lines)
+        self.text = "".join(text_parts)
+
+    def _add_block(self, block_spans, line_no, source):
+        """
+        Tokenise a block's lines, given as spans of the text buffer along with their
+        `source` (the `MappedText`, or else the block's lines themselves).
+        """
+        start_line = line_no - len(block_spans) + 1
+        base = len(self.prefixes)
+        if isinstance(source, MappedText):
+            nodes = self.tokeniser.tokenise_block(
+                block_spans, start_line, self.n_blocks, source
+            )
+        else:
+            nodes = self.tokeniser.tokenise_block(source, start_line, self.n_blocks)
+        self.block_starts.append(base)
+        for (start, end), node in zip(block_spans, nodes):
+            self.prefixes.append(node._pre)
+            self.suffixes.append(node._suf)
+            self.line_nos.append(node.line_no)
+            self.block_nos.append(node.block_no)
+            if hasattr(node, "paired_to"):
+                _, paired_line_no = node.paired_to
+                self.paired.append(base + paired_line_no - start_line)
+            else:
+                self.paired.append(-1)
+            self.line_starts.append(start)
+            self.line_ends.append(end)
+        stop = len(self.prefixes)
+        for header, first, last in list_spans(self.prefixes, self.suffixes, base, stop):
+            self.list_headers.append(-1 if header is None else header)
+            self.list_starts.append(first)
+            self.list_stops.append(last)
+
+    def __len__(self):
+        return len(self.prefixes)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("NodeTable index out of range")
+        return TableNode(self, i)
+
+    @property
+    def nodes(self):
+        return NodeRange(self, 0, len(self))
+
+    @property
+    def n_blocks(self):
+        return len(self.block_starts)
+
+    @property
+    def blocks(self):
+        return [TableBlock(self, b) for b in range(self.n_blocks)]
+
+    @property
+    def lists(self):
+        return [TableList(self, l) for l in range(len(self.list_starts))]
+
+    def line(self, i):
+        "The full line of the node at index `i` (i.e. including any affixes)."
+        return self.text[self.line_starts[i] : self.line_ends[i]]
+
+    def contents(self, i):
+        "The contents of the node at index `i` (i.e. its line without affixes)."
+        prefix = prefix_by_code[self.prefixes[i]]
+        suffix = suffix_by_code[self.suffixes[i]]
+        start = self.line_starts[i] + (len(prefix.str) if prefix else 0)
+        end = self.line_ends[i] - (len(suffix.str) if suffix else 0)
+        return self.text[start:end]
+
+    def indices(self, prefix=None, suffix=None):
+        """
+        Indexes of the nodes with the given `prefix` and/or `suffix` (matched by
+        identity, so `Prefix.Answer` and `Prefix.InitList` are told apart).
+        """
+        if prefix is None and suffix is None:
+            return range(len(self))
+        pre = None if prefix is None else prefix_codes[prefix._name_]
+        suf = None if suffix is None else suffix_codes[suffix._name_]
+        return [
+            i
+            for i in range(len(self))
+            if (pre is None or self.prefixes[i] == pre)
+            and (suf is None or self.suffixes[i] == suf)
+        ]
+
+    def count(self, prefix=None, suffix=None):
+        "Count the nodes with the given `prefix` and/or `suffix`."
+        if suffix is None and prefix is not None:
+            return self.prefixes.count(prefix_codes[prefix._name_])
+        return len(self.indices(prefix, suffix))
+
+    def select(self, prefix=None, suffix=None):
+        "Views on the nodes with the given `prefix` and/or `suffix`."
+        return [TableNode(self, i) for i in self.indices(prefix, suffix)]
+
+    def as_numpy(self):
+        "Zero-copy NumPy views on the node columns (keyed by column name)."
+        frombuffer = import_numpy().frombuffer
+
+        cols = ["prefixes", "suffixes", "line_nos", "block_nos", "paired"]
+        return {
+            c: frombuffer(getattr(self, c), dtype=getattr(self, c).typecode)
+            for c in cols
+        }
+
+    def __repr__(self):
+        s = "s" if (self.n_blocks != 1) else ""
+        n_lists = len(self.list_starts)
+        ls = "s" if n_lists != 1 else ""
+        return (
+            f"Node table of {len(self)} nodes in {self.n_blocks} block{s}"
+            f", containing {n_lists} list{ls}"
+        )
+
+
+class TableNode:
+    """
+    View on the node at `index` of a `NodeTable`, giving the same interface as a
+    `Node` (though read-only).
+    """
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def prefix(self):
+        return prefix_by_code[self.table.prefixes[self.index]]
+
+    @property
+    def suffix(self):
+        return suffix_by_code[self.table.suffixes[self.index]]
+
+    @property
+    def contents(self):
+        return self.table.contents(self.index)
+
+    @property
+    def line_no(self):
+        return self.table.line_nos[self.index]
+
+    @property
+    def block_no(self):
+        return self.table.block_nos[self.index]
+
+    @property
+    def paired_to(self):
+        paired = self.table.paired[self.index]
+        if paired < 0:
+            raise AttributeError("Unpaired node has no 'paired_to' attribute")
+        return (self.table.block_nos[paired], self.table.line_nos[paired])
+
+    def __eq__(self, other):
+        if isinstance(other, TableNode):
+            return self.table is other.table and self.index == other.index
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((id(self.table), self.index))
+
+    def __repr__(self):
+        return self.table.line(self.index)
+
+
+class TableBlock:
+    "View on the block numbered `number` of a `NodeTable`."
+
+    __slots__ = ("table", "number")
+
+    def __init__(self, table, number):
+        self.table = table
+        self.number = number
+
+    @property
+    def _node_range(self):
+        starts = self.table.block_starts
+        stop = starts[self.number + 1] if self.number + 1 < len(starts) else None
+        return starts[self.number], len(self.table) if stop is None else stop
+
+    @property
+    def nodes(self):
+        return NodeRange(self.table, *self._node_range)
+
+    @property
+    def start_line(self):
+        return self.table.line_nos[self.table.block_starts[self.number]]
+
+    @property
+    def end_line(self):
+        first, stop = self._node_range
+        return self.start_line + stop - first - 1
+
+    def __repr__(self):
+        first, stop = self._node_range
+        return (
+            f"Block {self.number} of {stop - first} "
+            f"nodes (L{self.start_line}-L{self.end_line})"
+        )
+
+
+class TableList:
+    "View on the list numbered `number` of a `NodeTable`."
+
+    __slots__ = ("table", "number")
+
+    def __init__(self, table, number):
+        self.table = table
+        self.number = number
+
+    @property
+    def header(self):
+        header = self.table.list_headers[self.number]
+        return None if header < 0 else TableNode(self.table, header)
+
+    @property
+    def nodes(self):
+        table = self.table
+        return NodeRange(
+            table, table.list_starts[self.number], table.list_stops[self.number]
+        )
+
+    @property
+    def all_nodes(self):
+        return [self.header, *self.nodes] if self.header else list(self.nodes)
+
+    def __repr__(self):
+        headered = ("H" if self.header else "Unh") + "eadered"
+        return f"{headered} list with {len(self.nodes)} items"
@@ -1,8 +1,11 @@
+import threading
+from types import MappingProxyType
+
 from aenum import NamedConstant
 
 from ...__share__ import classproperty
 
-__all__ = ["tokenise_line", "Prefix", "Suffix", "Node"]
+__all__ = ["tokenise_line", "Tokeniser", "Prefix", "Suffix", "Node"]
 
 
 def has_precedent(seen, prefix):
@@ -24,96 +27,234 @@ def lever_config_dict():
     }
 
 
-def tokenise_line(line, line_no, block_no, seen=None, config=None):
+def resolve_lever_config(config=None):
     """
-    Follow rules for prefix and suffix token order, splitting
-    the string into `(prefix, contents, suffix)`. Optionally
-    specify `custom_config` dict to override defaults from
-    `lever_config_dict`.
+    Merge a custom `config` dict over the defaults from `lever_config_dict`
+    (only custom config keys also present in the defaults are kept).
     """
-    # Begin config instantation
     default_config = lever_config_dict()
     if config:
-        # Only allow custom config keys also present in default_config dict
         config = {k: v for k, v in config.items() if k in default_config}
         config = {**default_config, **config}  # override default config
     else:
         config = default_config
-    # Read config variables
-    # TODO: just read into locals if config gets any more complicated
-    ALLOW_LIST_WITHOUT_SUFFIX_INIT = config.get("ALLOW_LIST_WITHOUT_SUFFIX_INIT")
-    # End config instantation
-    seen = seen if seen else []  # avoid default mutable arg gotcha
-    penultimate = seen[-1] if seen else None  # directly preceding
-    node = Node(
-        prefix=None, contents=line, suffix=None, line_no=line_no, block_no=block_no
-    )
-    if line == "":
-        node.prefix = Prefix.BlankNode
-    elif line.startswith("-:"):
+    return config
+
+
+def tokenise_line(line, line_no, block_no, seen=None, config=None):
+    """
+    Follow rules for prefix and suffix token order, splitting
+    the string into `(prefix, contents, suffix)`. Optionally
+    specify `custom_config` dict to override defaults from
+    `lever_config_dict`.
+
+    To tokenise many lines, use a `Tokeniser` rather than this function,
+    which resolves the config and scans all of the `seen` nodes on every call.
+    """
+    if config:
+        tokeniser = Tokeniser(config)
+    elif (tokeniser := getattr(_default_tokenisers, "tokeniser", None)) is None:
+        tokeniser = _default_tokenisers.tokeniser = Tokeniser()
+    tokeniser.resume(seen)
+    return tokeniser.tokenise(line, line_no, block_no)
+
+
+# The `Tokeniser` of the default config reused by `tokenise_line` (one per thread,
+# as each holds the lookbehind state of the line it is tokenising)
+_default_tokenisers = threading.local()
+
+
+class Tokeniser:
+    """
+    Tokenise lines into `Node` objects by the same rules as `tokenise_line`, but
+    resolving the config once (rather than per line) and dispatching each line on
+    its first two characters through a precomputed table.
+
+    The lookbehind state (the directly preceding node, and whether a list has been
+    opened in the block) is tracked as each line is tokenised rather than recovered
+    from the `seen` nodes, so a block tokenises in linear time. Call `reset` at each
+    block boundary (done by `tokenise_block`).
+    """
+
+    max_header = 8  # 1-based count of header levels
+
+    def __init__(self, config=None):
+        self.config = config = resolve_lever_config(config)
+        self.allow_list_without_suffix_init = config.get(
+            "ALLOW_LIST_WITHOUT_SUFFIX_INIT"
+        )
+        self.reset()
+
+    def __reduce__(self):
+        # Pickle by config alone (the lookbehind state is rebuilt)
+        return (type(self), (self.config,))
+
+    def reset(self):
+        "Clear the lookbehind state (i.e. at the start of a new block)."
+        self.penultimate = None  # directly preceding
+        self.list_opened = False
+
+    def resume(self, seen=None):
+        "Restore the lookbehind state from a list of already tokenised nodes."
+        self.reset()
+        if seen:
+            self.penultimate = seen[-1]
+            self.list_opened = has_precedent(seen, Prefix.InitList)
+
+    def tokenise_block(self, block_lines, start_line, block_no, source=None):
+        """
+        Tokenise the (newline-stripped) lines of a block, numbered from `start_line`.
+        If a `source` (`MappedText`) is given, `block_lines` are the `(start, end)`
+        spans of the lines in it rather than strings.
+        """
+        self.reset()
+        if source is not None:
+            return [
+                self.tokenise_span(
+                    source,
+                    start,
+                    end,
+                    source.head(start, end),
+                    start_line + i,
+                    block_no,
+                )
+                for i, (start, end) in enumerate(block_lines)
+            ]
+        return [
+            self.tokenise(l, start_line + i, block_no)
+            for i, l in enumerate(block_lines)
+        ]
+
+    def tokenise(self, line, line_no, block_no):
+        "Tokenise a single line, which is taken to directly follow the last one seen."
+        return self.tokenise_span(line, 0, len(line), line, line_no, block_no)
+
+    def tokenise_span(self, source, start, end, head, line_no, block_no):
+        """
+        Tokenise the line from `start` to `end` of `source` (a string or `MappedText`),
+        determining its prefix from `head`: either the line itself or its first few
+        characters (at least `MappedText.head_len` bytes' worth).
+        """
+        lead = head[:2]
+        if lead in self._dispatch:
+            prefix = self._dispatch[lead](self, head)
+        elif start == end:
+            prefix = Prefix.BlankNode
+        elif lead.startswith("-"):
+            prefix = Prefix.PlainNode
+        else:
+            raise ValueError(f"Unable to tokenise line: '{source[start:end]}'")
+        prefix_code = 0 if prefix is None else prefix_codes[prefix._name_]
+        node = Node.from_span(source, start, end, prefix_code, line_no, block_no)
+        if prefix is Prefix.Answer:
+            # Keep a record of the location of its paired node
+            penultimate = self.penultimate
+            penultimate.paired_to = (block_no, line_no)
+            node.paired_to = (penultimate.block_no, penultimate.line_no)
+        elif prefix is Prefix.InitList:
+            self.list_opened = True
+        self.penultimate = node
+        return node
+
+    def _colon_prefix(self, line):
+        penultimate = self.penultimate
         if line[2] == "'":
-            node.prefix = Prefix.Because
+            return Prefix.Because
         elif line[2] == ".":
-            node.prefix = Prefix.Therefore
+            return Prefix.Therefore
         elif penultimate:
             if penultimate.prefix is Prefix.Question:
-                node.prefix = Prefix.Answer
-                # Keep a record of the location of its paired node
-                penultimate.paired_to = (block_no, line_no)
-                node.paired_to = (penultimate.block_no, penultimate.line_no)
-            elif penultimate.contents.endswith(":"):
+                return Prefix.Answer
+            elif penultimate.endswith(Suffix.InitList.str):
                 # Mark penultimate line's suffix as beginning a list
                 penultimate.suffix = Suffix.InitList
-                node.prefix = Prefix.InitList
-            elif ALLOW_LIST_WITHOUT_SUFFIX_INIT:
-                node.prefix = Prefix.InitList
+                return Prefix.InitList
+            elif self.allow_list_without_suffix_init:
+                return Prefix.InitList
             else:
-                print(f"Falling through... {node.contents}")
-        elif ALLOW_LIST_WITHOUT_SUFFIX_INIT:
-            node.prefix = Prefix.InitList
+                print(f"Falling through... {line}")
+        elif self.allow_list_without_suffix_init:
+            return Prefix.InitList
         # (Question not implemented here)
-    elif line.startswith("-?"):
-        node.prefix = Prefix.Question
-    elif line.startswith("-,"):
-        if line[2] == ":" and has_precedent(seen, Prefix.InitList):
+        return None
+
+    def _question_prefix(self, line):
+        return Prefix.Question
+
+    def _comma_prefix(self, line):
+        if line[2] == ":" and self.list_opened:
             # For now consider a list 'open' indefinitely while the block is
             # i.e. until blank line (TODO implement break at section divider)
-            node.prefix = Prefix.ContList
+            return Prefix.ContList
         elif line[2] == ",":
-            node.prefix = Prefix.Ascent
+            return Prefix.Ascent
         elif line[2] == "?":
-            node.prefix = Prefix.ContQuestion
+            return Prefix.ContQuestion
         else:
-            node.prefix = Prefix.FollowOn
-    elif line.startswith("-."):
+            return Prefix.FollowOn
+
+    def _stop_prefix(self, line):
         if line[2] == ".":
-            node.prefix = Prefix.Descent
+            return Prefix.Descent
         elif line[2] == ",":
-            node.prefix = Prefix.ContDesc
-    elif line.startswith("-#"):
-        max_header = 8  # 1-based count of header levels
+            return Prefix.ContDesc
+        return None
+
+    def _header_prefix(self, line):
         start_at = len(Prefix.Header1.str)
-        confirmed_levels = 1
-        for i, l in enumerate(line[start_at : start_at + max_header]):
-            if l != "#":
-                break
-            else:
-                confirmed_levels += 1
-        if confirmed_levels > max_header:
-            raise ValueError(f"Can't parse header beyond level {max_header} ('{line}')")
-        header_name = f"Header{confirmed_levels}"
-        node.prefix = Prefix.token_from_name(header_name)
-    elif line.startswith("-~==~-"):
-        node.prefix = Prefix.SectBreak
-    elif line.startswith("-"):
-        node.prefix = Prefix.PlainNode
-    else:
-        raise ValueError(f"Unable to tokenise line: '{line}'")
-    # If this succeeded without raising an error, make contents
-    return node
+        hashes = line[start_at : start_at + self.max_header]
+        confirmed_levels = 1 + len(hashes) - len(hashes.lstrip("#"))
+        if confirmed_levels > self.max_header:
+            raise ValueError(
+                f"Can't parse header beyond level {self.max_header} ('{line}')"
+            )
+        return header_prefixes[confirmed_levels - 1]
+
+    def _tilde_prefix(self, line):
+        if line.startswith(Prefix.SectBreak.str):
+            return Prefix.SectBreak
+        return Prefix.PlainNode
+
+    # The prefix rules to dispatch to on the first two characters of a line, built
+    # once for the class (rather than per instance, as `tokenise_line` makes one)
+    _dispatch = {
+        "-:": _colon_prefix,
+        "-?": _question_prefix,
+        "-,": _comma_prefix,
+        "-.": _stop_prefix,
+        "-#": _header_prefix,
+        "-~": _tilde_prefix,
+    }
 
 
-class Affix(NamedConstant):
+class AffixMeta(type(NamedConstant)):
+    """
+    Build the lookup tables of each `Affix` subclass once, upon its creation, as
+    read-only mappings (a token may be shared, e.g. `Prefix.Answer` and `InitList`).
+    """
+
+    def __new__(metacls, cls, bases, clsdict):
+        affix_cls = super().__new__(metacls, cls, bases, clsdict)
+        members = tuple(affix_cls._members_.values())
+        tokseq2toks = {}
+        for m in members:
+            tokseq2toks.setdefault(m._value_, []).append(m)
+        affix_cls._tokseq2toks = MappingProxyType(
+            {k: tuple(v) for k, v in tokseq2toks.items()}
+        )
+        affix_cls._tokseq2names = MappingProxyType(
+            {k: tuple(m._name_ for m in v) for k, v in tokseq2toks.items()}
+        )
+        affix_cls._name2tok = MappingProxyType({m._name_: m for m in members})
+        # Small integer codes (in order of definition), with 0 for no affix
+        affix_cls._by_code = (None, *members)
+        affix_cls._name2code = MappingProxyType(
+            {m._name_: i for i, m in enumerate(members, start=1)}
+        )
+        return affix_cls
+
+
+class Affix(NamedConstant, metaclass=AffixMeta):
     """
     Affixes following the MMD 'lever' format specification.
     """
@@ -122,9 +263,9 @@ class Affix(NamedConstant):
     def name_from_tokenseq(cls, tok):
         """
         IN: the string matched by the token. OUT: the node name or
-        a list of names if the token name is not unique.
+        a tuple of names if the token name is not unique.
         """
-        matched = cls.tokseq2name_multidict.get(tok)
+        matched = cls._tokseq2names.get(tok)
         if matched:
             if len(matched) == 1:
                 [matched] = matched
@@ -132,35 +273,36 @@ class Affix(NamedConstant):
             raise KeyError(f"{tok} not a valid Affix token sequence")
         return matched
 
-    # @classproperty
-    # def tokseq2name_dict(cls):
-    #    "KEY: the string matched by the token. VAL: the node name."
-    #    # N.B. does not assume the token-matching string is unique
-    #    d = {k: v._value_ for k,v in Prefix.__members__.items()}
-    #    return d
-
     @classproperty
     def tokseq2name_multidict(cls):
-        "KEY: the string matched by the token(s). VAL: list of node name(s)."
+        "KEY: the string matched by the token(s). VAL: tuple of node name(s)."
         # N.B. does not assume the token-matching string is unique
-        d = {
-            v._value_: [
-                k for k in cls._members_ if cls._members_.get(k)._value_ == v._value_
-            ]
-            for v in cls._members_.values()
-        }
-        return d
+        return cls._tokseq2names
+
+    @classproperty
+    def tokseq2tok_multidict(cls):
+        "KEY: the string matched by the token(s). VAL: tuple of token(s)."
+        return cls._tokseq2toks
 
     @classmethod
     def token_from_name(cls, name):
         "IN: the node name. OUT: the token (a `NamedConstant` object)."
-        return cls.name2tok_dict.get(name)
+        return cls._name2tok.get(name)
 
     @classproperty
     def name2tok_dict(cls):
         "KEY: the node name. VAL: the token (a `NamedConstant` object)."
-        d = {v._name_: v for v in cls._members_.values()}
-        return d
+        return cls._name2tok
+
+    @classmethod
+    def token_from_code(cls, code):
+        "IN: the integer code (0 for no affix). OUT: the token (or `None`)."
+        return cls._by_code[code]
+
+    @classmethod
+    def code_from_name(cls, name):
+        "IN: the node name. OUT: the integer code of the token."
+        return cls._name2code[name]
 
     @property
     def str(self):
@@ -211,21 +353,79 @@ class Suffix(Affix):
     InitList = ":"
 
 
+# Small integer codes for the affixes (in order of definition), with 0 for no affix
+prefix_by_code = Prefix._by_code
+suffix_by_code = Suffix._by_code
+prefix_codes = Prefix._name2code
+suffix_codes = Suffix._name2code
+header_prefixes = tuple(
+    Prefix.token_from_name(f"Header{i}") for i in range(1, Tokeniser.max_header + 1)
+)
+
+
 class Node:
     """
     Provide a simple string-repr while storing the Prefix and Suffix
-    as properties (intervening `contents` is just a string for now).
+    as small integer codes (exposed as `NamedConstant` properties).
+    The intervening `contents` are kept as start/end offsets into the
+    original line (or a `MappedText`), and only sliced out upon access.
     """
 
+    # `__dict__` is only allocated if a list parser labels the node's values
+    __slots__ = (
+        "_line",
+        "_start",
+        "_end",
+        "_pre",
+        "_suf",
+        "line_no",
+        "block_no",
+        "paired_to",
+        "parts",
+        "__dict__",
+    )
+
     def __init__(
         self, prefix=None, contents=None, suffix=None, line_no=None, block_no=None
     ):
-        self.prefix = prefix
+        if prefix:
+            assert isinstance(prefix, Prefix)  # either `None` or `Prefix` NamedConstant
+        if suffix:
+            assert isinstance(suffix, Suffix)  # either `None` or `Suffix` NamedConstant
+        self._pre = 0 if prefix is None else prefix_codes[prefix._name_]
+        self._suf = 0 if suffix is None else suffix_codes[suffix._name_]
         self.contents = contents
-        self.suffix = suffix
         self.line_no = line_no
         self.block_no = block_no
 
+    @classmethod
+    def from_span(cls, source, start, end, prefix_code, line_no, block_no):
+        """
+        Create a node from the line spanning `start` to `end` of `source` (a string, or
+        a `MappedText` indexed by byte offsets) whose prefix (given by its code) has
+        been determined, without copying the line or going through the setters.
+        """
+        node = cls.__new__(cls)
+        node._line = source
+        node._start = start + (
+            len(prefix_by_code[prefix_code].str) if prefix_code else 0
+        )
+        node._end = end
+        node._pre = prefix_code
+        node._suf = 0
+        node.line_no = line_no
+        node.block_no = block_no
+        return node
+
+    def __reduce__(self):
+        "Pickle compactly, as the line, offsets and affix codes (and any other values)."
+        extras = {
+            k: getattr(self, k) for k in ("paired_to", "parts") if hasattr(self, k)
+        }
+        extras.update(self.__dict__)
+        state = (self._line, self._start, self._end, self._pre, self._suf)
+        return (_restore_node, (*state, self.line_no, self.block_no, extras or None))
+
     def __repr__(self):
         pre = self.prefix.str if self.prefix else ""
         con = self.contents if self.contents else ""
@@ -234,44 +434,82 @@ class Node:
 
     @property
     def prefix(self):
-        return self._prefix
+        return prefix_by_code[self._pre]
 
     @prefix.setter
     def prefix(self, p):
-        if hasattr(self, "_prefix"):
-            # modifying an already set prefix so must also modify `self.contents`
-            ex_prefix = self.prefix
-            if ex_prefix:
-                assert self.contents, "Tried to change prefix on contents-less Node"
-                self.contents = ex_prefix.str + self.contents  # reconstitute
-            if p:
-                self.contents = self.contents[len(p.str) :]
+        # modifying an already set prefix so must also modify `self.contents`
+        ex_prefix = self.prefix
+        if ex_prefix:
+            assert self.contents, "Tried to change prefix on contents-less Node"
+            self._widen(ex_prefix.str, "")  # reconstitute
         if p:
             assert isinstance(p, Prefix)  # either `None` or `Prefix` NamedConstant
-        self._prefix = p
+            self._start = min(self._start + len(p.str), self._end)
+        self._pre = 0 if p is None else prefix_codes[p._name_]
 
     @property
     def contents(self):
-        return self._contents
+        if self._line is None:
+            return None
+        return self._line[self._start : self._end]
 
     @contents.setter
     def contents(self, c):
-        self._contents = c
+        self._line = c
+        self._start = 0
+        self._end = len(c) if c else 0
 
     @property
     def suffix(self):
-        return self._suffix
+        return suffix_by_code[self._suf]
 
     @suffix.setter
     def suffix(self, s):
-        if hasattr(self, "_suffix"):
-            # modifying an already set suffix so must also modify `self.contents`
-            ex_suffix = self.suffix
-            if ex_suffix:
-                assert self.contents, "Tried to change suffix on content-less Node"
-                self.contents = self.contents + ex_suffix.str
-            if s:
-                self.contents = self.contents[: -len(s.str)]
+        # modifying an already set suffix so must also modify `self.contents`
+        ex_suffix = self.suffix
+        if ex_suffix:
+            assert self.contents, "Tried to change suffix on content-less Node"
+            self._widen("", ex_suffix.str)
         if s:
             assert isinstance(s, Suffix)  # either `None` or `Suffix` NamedConstant
-        self._suffix = s
+            self._end = max(self._end - len(s.str), self._start)
+        self._suf = 0 if s is None else suffix_codes[s._name_]
+
+    def _widen(self, pre, suf):
+        """
+        Extend the contents to cover the `pre` and `suf` strings either side of it,
+        moving the offsets if the line has them there, else materialising a new line.
+        """
+        line, start, end = self._line, self._start, self._end
+        pre_start, suf_end = start - len(pre), end + len(suf)
+        if (
+            pre_start >= 0
+            and line.startswith(pre, pre_start, start)
+            and line.startswith(suf, end, suf_end)
+        ):
+            self._start, self._end = pre_start, suf_end
+        else:
+            self.contents = pre + self.contents + suf
+
+    def endswith(self, s):
+        "Whether the contents end with the string `s`, without materialising them."
+        return self._line.endswith(s, self._start, self._end)
+
+
+def _restore_node(line, start, end, pre, suf, line_no, block_no, extras=None):
+    "Unpickle a `Node` (see `Node.__reduce__`)."
+    node = Node.__new__(Node)
+    node._line, node._start, node._end, node._pre, node._suf = (
+        line,
+        start,
+        end,
+        pre,
+        suf,
+    )
+    node.line_no = line_no
+    node.block_no = block_no
+    if extras:
+        for k, v in extras.items():
+            setattr(node, k, v)
+    return node
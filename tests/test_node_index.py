@@ -0,0 +1,59 @@
+from quill.scan.lever.parser import Doc
+from quill.scan.lever.tokens import Prefix
+
+lines = [
+    "-## Questions",
+    "-? What is it",
+    "-: An answer",
+    "",
+    "-Some list:",
+    "-: first",
+    "-: second",
+    "",
+    "-? Another question",
+    "-: Another answer",
+]
+
+
+def all_nodes(doc):
+    return [n for b in doc.blocks for n in b.nodes]
+
+
+def assert_index_agrees(doc):
+    nodes = all_nodes(doc)
+    for node in nodes:
+        assert doc.node_at(node.line_no) is node
+    separators = {b.end_line + 1 for b in doc.blocks[:-1]}
+    assert all(doc.node_at(line_no) is None for line_no in separators)
+    for node in nodes:
+        if hasattr(node, "paired_to"):
+            pair = doc.pair_of(node)
+            assert pair.line_no == node.paired_to[1]
+            assert doc.pair_of(pair) is node
+        else:
+            assert doc.pair_of(node) is None
+    for prefix in (Prefix.Question, Prefix.Answer, Prefix.InitList, Prefix.Header2):
+        assert doc.nodes_by_prefix(prefix) == [n for n in nodes if n.prefix is prefix]
+
+
+def test_index_after_update():
+    doc = Doc(lines)
+    assert_index_agrees(doc)
+    # insert a block at the start: the reused blocks' nodes are renumbered
+    new_lines = ["-? A new question", "-: A new answer", "", *lines]
+    assert doc.update(new_lines) == [0]
+    assert_index_agrees(doc)
+    fresh = Doc(new_lines)
+    assert [n.line_no for n in doc.nodes_by_prefix(Prefix.Answer)] == [
+        n.line_no for n in fresh.nodes_by_prefix(Prefix.Answer)
+    ]
+    new_answer = doc.node_at(2)  # (line numbers are 1-based)
+    assert new_answer.prefix is Prefix.Answer
+    assert new_answer.contents == fresh.node_at(2).contents
+    assert doc.pair_of(new_answer) is doc.node_at(1)
+
+
+def test_nodes_by_prefix_is_a_copy():
+    doc = Doc(lines)
+    doc.nodes_by_prefix(Prefix.Question).clear()
+    assert len(doc.nodes_by_prefix(Prefix.Question)) == 2